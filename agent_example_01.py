@@ -29,9 +29,16 @@ from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import BingCustomSearchTool
 from azure.identity import DefaultAzureCredential
 
+from run_executor import RunExecutor
+from run_waiter import RunWaiter
+from transcript_sink import open_transcript_sink
+
 # Load environment variables from .env
 load_dotenv()
 
+# Messages, tool calls and runs are also written as JSONL when AGENT_TRANSCRIPT_DIR is set.
+transcript = open_transcript_sink("agent_example_01")
+
 endpoint = os.environ["AZURE_AI_AGENT_ENDPOINT"]
 model_deployment_name = os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
 bing_connection_name = os.environ["AZURE_BING_CONNECTION_NAME"]
@@ -84,9 +91,14 @@ message = agent_client.messages.create(
 print(f"Created message, message ID: {message.id}")
 
 # run/send the message to the agent
-run = agent_client.runs.create_and_process(
-    thread_id=thread.id, agent_id=agent.id)
+# Transient failures (throttling, server errors) are retried in a new run on the same thread.
+# The run status is polled with an adaptive interval: fast at first, then slower for long runs.
+run_executor = RunExecutor(run_waiter=RunWaiter())
+run = run_executor.run(agent_client, thread_id=thread.id, agent_id=agent.id)
 print(f"Run finished with status: {run.status}")
+transcript.run(run)
+print(f"Run executor metrics: {run_executor.metrics()}")
+print(f"Run polling: {run_executor.run_waiter.last_stats if run_executor.run_waiter else None}")
 
 if run.status == "failed":
     print(f"Run failed: {run.last_error}")
@@ -98,12 +110,16 @@ else:
     for msg in response:
         if msg.role == "assistant":
             print(f"Agent response: {msg.content}")
+            transcript.message(msg)
 
 
-# Cleanup: Delete the agent and the thread.
+# Cleanup: Delete the agent and the thread, then close the transcript.
 
 agent_client.threads.delete(thread.id)
 print(f"Deleted thread with ID: {thread.id}")
 
 agent_client.delete_agent(agent.id)
 print(f"Deleted agent with ID: {agent.id}")
+
+# Raises if the transcript could not be written (e.g. a full disk), once nothing is left on the service.
+transcript.close()
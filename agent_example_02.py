@@ -37,9 +37,16 @@ from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import BingCustomSearchTool, ConnectedAgentTool
 from azure.identity import DefaultAzureCredential
 
+from run_executor import RunExecutor
+from run_waiter import RunWaiter
+from transcript_sink import open_transcript_sink
+
 # Load environment variables from .env
 load_dotenv()
 
+# Messages, tool calls and runs are also written as JSONL when AGENT_TRANSCRIPT_DIR is set.
+transcript = open_transcript_sink("agent_example_02")
+
 endpoint = os.environ["AZURE_AI_AGENT_ENDPOINT"]
 model_deployment_name = os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
 bing_connection_name = os.environ["AZURE_BING_CONNECTION_NAME"]
@@ -106,9 +113,14 @@ message = agent_client.messages.create(
 print(f"Created message, message ID: {message.id}")
 
 # run/send the message to the agent
-run = agent_client.runs.create_and_process(
-    thread_id=thread.id, agent_id=orchestrator_agent.id)
+# Transient failures (throttling, server errors) are retried in a new run on the same thread.
+# The run status is polled with an adaptive interval: fast at first, then slower for long runs.
+run_executor = RunExecutor(run_waiter=RunWaiter())
+run = run_executor.run(agent_client, thread_id=thread.id, agent_id=orchestrator_agent.id)
 print(f"Run finished with status: {run.status}")
+transcript.run(run)
+print(f"Run executor metrics: {run_executor.metrics()}")
+print(f"Run polling: {run_executor.run_waiter.last_stats if run_executor.run_waiter else None}")
 
 if run.status == "failed":
     print(f"Run failed: {run.last_error}")
@@ -120,6 +132,7 @@ else:
     for msg in response:
         if msg.role == "assistant":
             print(f"Agent response: {msg.content}")
+            transcript.message(msg)
 
             print("\nTool calls made by the agent:")
             # update the thread to access tool calls
@@ -134,8 +147,14 @@ else:
             # Print the tool calls made by the agent in the run
             print(f"Run tool used: {run.tools[0]["connected_agent"]}")
 
+    # Log the tool calls made in the run steps (the call to the connected agent), once per run
+    if transcript.enabled:
+        for step in agent_client.run_steps.list(thread_id=thread.id, run_id=run.id):
+            for tool_call in getattr(step.step_details, "tool_calls", None) or []:
+                transcript.tool_call(tool_call)
 
-# Cleanup: Delete the agents and the thread.
+
+# Cleanup: Delete the agents and the thread, then close the transcript.
 
 agent_client.threads.delete(thread.id)
 print(f"Deleted thread with ID: {thread.id}")
@@ -145,3 +164,6 @@ print(f"Deleted agent with ID: {bing_agent.id}")
 
 agent_client.delete_agent(orchestrator_agent.id)
 print(f"Deleted agent with ID: {orchestrator_agent.id}")
+
+# Raises if the transcript could not be written (e.g. a full disk), once nothing is left on the service.
+transcript.close()
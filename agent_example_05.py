@@ -1,13 +1,17 @@
 import asyncio
+from functools import partial
 
 from azure.identity.aio import DefaultAzureCredential
 
 from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
-from semantic_kernel.agents import GroupChatOrchestration, RoundRobinGroupChatManager, BooleanResult
+from semantic_kernel.agents import RoundRobinGroupChatManager, BooleanResult
 from semantic_kernel.agents.runtime import InProcessRuntime
 from semantic_kernel.contents import AuthorRole
 from semantic_kernel.contents import ChatMessageContent
 
+from chat_history_store import BoundedChatHistory, BoundedGroupChatOrchestration
+from transcript_sink import TranscriptSink, NullTranscriptSink, open_transcript_sink
+
 
 
 """
@@ -19,6 +23,9 @@ it's using a 'Termination strategy' that allows one agent to approve the work of
 
 We are defining a `callball` function that will be called when an agent sends a message in the group chat.
 
+The orchestration and the manager only keep the last messages of the chat (see chat_history_store.py),
+so memory and time per round stay flat with many rounds.
+
 Based on this example:
 https://github.com/microsoft/semantic-kernel/blob/main/python/samples/getting_started_with_agents/azure_ai_agent/step3_azure_ai_agent_group_chat.py
 but using GroupChatOrchestration instead of AgentGroupChat, that is deprecated.
@@ -30,21 +37,30 @@ https://learn.microsoft.com/semantic-kernel/frameworks/agent/agent-orchestration
 
 
 class ApprovalGroupChatManager(RoundRobinGroupChatManager):
-    def __init__(self, approver_name: str, max_rounds: int = 10):
+    def __init__(self, approver_name: str, max_rounds: int = 10, history: BoundedChatHistory | None = None):
         super().__init__(max_rounds=max_rounds)
         self._approver_name = approver_name
+        self._history = history if history is not None else BoundedChatHistory()
+
+    @property
+    def history(self) -> BoundedChatHistory:
+        return self._history
 
     async def should_terminate(self, chat_history):
-        last = chat_history[-1] if chat_history else None
+        # Only the messages we haven't seen yet are recorded, as compact records.
+        self._history.catch_up(chat_history)
+        last = self._history.last
         should_terminate = (
             last is not None and
-            getattr(last, 'name', None) == self._approver_name and
+            last.name == self._approver_name and
             'approved' in (last.content or '').lower()
         )
         return BooleanResult(result=should_terminate, reason="Approved by reviewer." if should_terminate else "Not yet approved.")
 
-async def agent_response_callback(message: ChatMessageContent) -> None:
+async def agent_response_callback(message: ChatMessageContent,
+                                  transcript: TranscriptSink | NullTranscriptSink) -> None:
     print(f"**{message.name}**\n{message.content}")
+    transcript.message(message)  # queued, written by a background thread
     await asyncio.sleep(5)  # Add a 5-second delay after each message
 
 REVIEWER_NAME = "ArtDirector"
@@ -73,6 +89,9 @@ TASK = "a slogan for a new line of electric cars."
 
 async def main():
     ai_agent_settings = AzureAIAgentSettings()
+
+    # The messages of the group chat are also written as JSONL when AGENT_TRANSCRIPT_DIR is set.
+    transcript = open_transcript_sink("agent_example_05")
     
 
     agent_client = AzureAIAgent.create_client(credential=DefaultAzureCredential(), 
@@ -108,10 +127,10 @@ async def main():
         definition=copy_writer_agent_definition,
     )
 
-    group_chat_orchestration = GroupChatOrchestration(
+    group_chat_orchestration = BoundedGroupChatOrchestration(
             members=[agent_writer, agent_reviewer],
             manager=ApprovalGroupChatManager(approver_name=REVIEWER_NAME),
-            agent_response_callback=agent_response_callback,
+            agent_response_callback=partial(agent_response_callback, transcript=transcript),
         )
 
     try:
@@ -134,9 +153,12 @@ async def main():
 
         
     finally:
-        # 8. Cleanup: Delete the agents
-        await agent_client.agents.delete_agent(agent_reviewer.id)
-        await agent_client.agents.delete_agent(agent_writer.id)
+        # 8. Cleanup: Delete the agents, then close the transcript (it raises if the transcript could not be written)
+        try:
+            await agent_client.agents.delete_agent(agent_reviewer.id)
+            await agent_client.agents.delete_agent(agent_writer.id)
+        finally:
+            transcript.close()
 
         """
         Sample Output:
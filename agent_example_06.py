@@ -1,13 +1,19 @@
 import asyncio
+import time
+from functools import partial
 
 from azure.identity.aio import DefaultAzureCredential
 
 from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
-from semantic_kernel.agents import GroupChatOrchestration, RoundRobinGroupChatManager, BooleanResult
+from semantic_kernel.agents import RoundRobinGroupChatManager, BooleanResult
 from semantic_kernel.agents.runtime import InProcessRuntime
 from semantic_kernel.contents import AuthorRole
 from semantic_kernel.contents import ChatMessageContent
 
+from chat_history_store import BoundedChatHistory, BoundedGroupChatOrchestration
+from transcript_sink import TranscriptSink, NullTranscriptSink, open_transcript_sink
+from termination import ApproverKeywordStrategy, ArithmeticAnswerStrategy, TerminationStrategyChain
+
 
 """
 The following sample demonstrates how to create two agents using
@@ -19,25 +25,57 @@ it's using a 'Termination strategy' that allows one agent to approve the work of
 We are defining a `callball` function that will be called when an agent sends a message in the group chat.
 
 Our two agents are a "teacher" and a "student", the teacher creates a math question and the student tries to answer it.
+
+The student's answer is first checked locally (see termination.py): when the teacher's question has an arithmetic
+expression and the student's answer gives its value, the chat ends without asking the teacher to approve it,
+saving a full LLM round trip. Otherwise the teacher reviews the answer as usual.
+
+The orchestration and the manager only keep the last messages of the chat (see chat_history_store.py),
+so memory and time per round stay flat with many rounds.
 """
 
 
 class ApprovalGroupChatManager(RoundRobinGroupChatManager):
-    def __init__(self, approver_name: str, max_rounds: int = 10):
+    def __init__(self, approver_name: str, max_rounds: int = 10, termination: TerminationStrategyChain | None = None,
+                 history: BoundedChatHistory | None = None):
         super().__init__(max_rounds=max_rounds)
         self._approver_name = approver_name
+        self._termination = termination or TerminationStrategyChain([ApproverKeywordStrategy(approver_name)])
+        self._history = history if history is not None else BoundedChatHistory()
+        self._last_round_at = time.monotonic()
+        self._approver_turns = 0
+        self._approver_seconds = 0.0
 
-    async def should_terminate(self, chat_history):
-        last = chat_history[-1] if chat_history else None
-        should_terminate = (
-            last is not None and
-            getattr(last, 'name', None) == self._approver_name and
-            'approved' in (last.content or '').lower()
-        )
-        return BooleanResult(result=should_terminate, reason="Approved by teacher." if should_terminate else "Not yet approved.")
+    @property
+    def history(self) -> BoundedChatHistory:
+        return self._history
 
-async def agent_response_callback(message: ChatMessageContent) -> None:
+    async def should_terminate(self, chat_history):
+        # Only the messages we haven't seen yet are recorded, as compact records.
+        self._history.catch_up(chat_history)
+        last = self._history.last
+
+        # Time each approver turn, to know how much a skipped one saves.
+        now = time.monotonic()
+        if last is not None and last.name == self._approver_name:
+            self._approver_turns += 1
+            self._approver_seconds += now - self._last_round_at
+        self._last_round_at = now
+
+        should_terminate = self._termination.should_terminate(self._history.recent)
+        return BooleanResult(result=should_terminate, reason=self._termination.reason)
+
+    def savings(self) -> str:
+        stats = self._termination.stats
+        approver_turn = self._approver_seconds / self._approver_turns if self._approver_turns else 0.0
+        return (f"{stats.rounds} rounds, {stats.local_decisions} decided locally, "
+                f"{stats.rounds_saved} {self._approver_name} rounds saved "
+                f"(~{stats.rounds_saved * approver_turn:.1f}s at {approver_turn:.1f}s per {self._approver_name} turn)")
+
+async def agent_response_callback(message: ChatMessageContent,
+                                  transcript: TranscriptSink | NullTranscriptSink) -> None:
     print(f"**{message.name}**\n{message.content}")
+    transcript.message(message)  # queued, written by a background thread
     await asyncio.sleep(5)  # Add a 5-second delay after each message
 
 TEACHER_NAME = "Teacher"
@@ -47,6 +85,7 @@ TEACHER_INSTRUCTIONS = """
   The goal is to determine if the given answer is correct.
           If the answer is correct, you stop the conversation by saying "approved".
           If the answer is wrong, you ask student to fix it.
+  Write the operation of the question with digits and symbols, for example: "What is 3 + 2?".
 """
 TEACHER_DESCRIPTION = "Teacher agent that creates pre-school math questions for students and checks answers."
 
@@ -60,6 +99,9 @@ TASK = "Ask to the teacher to give you a math problem and solve it"
 
 async def main():
     ai_agent_settings = AzureAIAgentSettings()
+
+    # The messages of the group chat are also written as JSONL when AGENT_TRANSCRIPT_DIR is set.
+    transcript = open_transcript_sink("agent_example_06")
     
 
     agent_client = AzureAIAgent.create_client(credential=DefaultAzureCredential(), 
@@ -95,10 +137,17 @@ async def main():
         definition=copy_student_agent_definition,
     )
 
-    group_chat_orchestration = GroupChatOrchestration(
+    # 5. Check the student's answers locally first, and fall back to the teacher's approval
+    termination = TerminationStrategyChain([
+        ArithmeticAnswerStrategy(questioner_name=TEACHER_NAME, answerer_name=STUDENT_NAME),
+        ApproverKeywordStrategy(approver_name=TEACHER_NAME),
+    ])
+    manager = ApprovalGroupChatManager(approver_name=TEACHER_NAME, termination=termination)
+
+    group_chat_orchestration = BoundedGroupChatOrchestration(
             members=[agent_student, agent_teacher],
-            manager=ApprovalGroupChatManager(approver_name=TEACHER_NAME),
-            agent_response_callback=agent_response_callback,
+            manager=manager,
+            agent_response_callback=partial(agent_response_callback, transcript=transcript),
         )
 
     try:
@@ -114,6 +163,7 @@ async def main():
         orchestration_result = await group_chat_orchestration.invoke(task=TASK, runtime=runtime)
         value = await orchestration_result.get()      
         print(f"***** Result *****\n{value}")
+        print(f"***** Early termination *****\n{manager.savings()}")
       
         # print(f"# {content.role} - {content.name or '*'}: '{content.content}'")
         # ???has this value role, name or content????
@@ -121,9 +171,12 @@ async def main():
 
         
     finally:
-        # 8. Cleanup: Delete the agents
-        await agent_client.agents.delete_agent(agent_teacher.id)
-        await agent_client.agents.delete_agent(agent_student.id)
+        # 8. Cleanup: Delete the agents, then close the transcript (it raises if the transcript could not be written)
+        try:
+            await agent_client.agents.delete_agent(agent_teacher.id)
+            await agent_client.agents.delete_agent(agent_student.id)
+        finally:
+            transcript.close()
 
         """
         Sample Output:
@@ -0,0 +1,218 @@
+"""
+Bounded chat histories for long group chat orchestrations.
+
+The manager actor of a `GroupChatOrchestration` keeps every message of the chat in its own `ChatHistory`, and makes a
+deep copy of it for each decision it asks the manager for (user input, termination, next agent, result). Each round
+copies the whole chat again, so with a high `max_rounds` both the memory and the time per round keep growing, although
+the `ApprovalGroupChatManager` of examples 05 and 06 only reads the last messages.
+
+* `TrimmedChatHistory` is a `ChatHistory` that only keeps its last `max_messages` messages, and counts all the messages
+  it was given (`messages_added`), so a reader can tell which ones are new.
+* `BoundedGroupChatOrchestration` is a `GroupChatOrchestration` whose manager actor keeps its chat in a
+  `TrimmedChatHistory`: the copies handed to the manager stop growing. It replaces `_register_manager`, a private
+  method of Semantic Kernel, so check it when upgrading `semantic-kernel`.
+* `BoundedChatHistory` is what the manager keeps of the chat: a ring buffer of the last `max_recent` messages, as
+  small `TranscriptRecord`s (slots, text only), and a `TurnSummary` per agent of the older messages.
+
+So the memory used is the same after 10 rounds or after 1,000.
+Run this file to check it: it grows the history of a simulated chat through `ApprovalGroupChatManager.should_terminate`
+the way the manager actor does, with a trimmed and with a plain `ChatHistory`, and prints the memory traced.
+
+Usage:
+    uv run chat_history_store.py --rounds 1000
+    uv run chat_history_store.py --rounds 1000 --unbounded
+"""
+
+# # tracemalloc, to trace the memory blocks allocated by Python:
+# https://docs.python.org/3/library/tracemalloc.html
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from semantic_kernel.agents import GroupChatOrchestration
+from semantic_kernel.agents.orchestration.group_chat import GroupChatManagerActor
+from semantic_kernel.agents.runtime import CoreRuntime
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+
+@dataclass(slots=True, frozen=True)
+class TranscriptRecord:
+    """What is kept of a chat message: who said what, and when."""
+
+    index: int
+    name: str | None
+    role: str
+    content: str
+    timestamp: float
+
+    @classmethod
+    def from_message(cls, message: ChatMessageContent, index: int) -> "TranscriptRecord":
+        return cls(index=index, name=message.name, role=message.role.value, content=message.content or "",
+                   timestamp=time.time())
+
+
+@dataclass(slots=True)
+class TurnSummary:
+    """Compact summary of the older messages of one agent: how many, their size, and their first and last index."""
+
+    name: str | None
+    turns: int = 0
+    chars: int = 0
+    first_index: int = 0
+    last_index: int = 0
+
+    def add(self, record: TranscriptRecord) -> None:
+        if self.turns == 0:
+            self.first_index = record.index
+        self.turns += 1
+        self.chars += len(record.content)
+        self.last_index = record.index
+
+
+class TrimmedChatHistory(ChatHistory):
+    """A `ChatHistory` that only keeps its last `max_messages` messages."""
+
+    max_messages: int = 40
+    messages_added: int = 0
+
+    def add_message(self, message: ChatMessageContent | dict[str, Any], encoding: str | None = None,
+                    metadata: dict[str, Any] | None = None) -> None:
+        super().add_message(message, encoding=encoding, metadata=metadata)
+        self.messages_added += 1
+        del self.messages[:-self.max_messages]
+
+
+def messages_added(chat_history: ChatHistory) -> int:
+    """How many messages were added to `chat_history`, including the ones trimmed away."""
+    return chat_history.messages_added if isinstance(chat_history, TrimmedChatHistory) else len(chat_history.messages)
+
+
+class BoundedGroupChatManagerActor(GroupChatManagerActor):
+    """The manager actor of a group chat, keeping the chat in a `TrimmedChatHistory`."""
+
+    def __init__(self, *args: Any, max_messages: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._chat_history = TrimmedChatHistory(max_messages=max_messages)
+
+
+class BoundedGroupChatOrchestration(GroupChatOrchestration):  # pyright: ignore[reportMissingTypeArgument]
+    """A `GroupChatOrchestration` whose manager only ever sees the last `max_messages` messages of the chat."""
+
+    def __init__(self, *args: Any, max_messages: int = 40, **kwargs: Any):
+        self._max_messages = max_messages
+        super().__init__(*args, **kwargs)
+
+    async def _register_manager(self, runtime: CoreRuntime, internal_topic_type: str,
+                                exception_callback: Callable[[BaseException], None],
+                                result_callback: Callable[[Any], Awaitable[None]] | None = None) -> None:
+        await BoundedGroupChatManagerActor.register(
+            runtime,
+            self._get_manager_actor_type(internal_topic_type),
+            lambda: BoundedGroupChatManagerActor(
+                self._manager,
+                internal_topic_type=internal_topic_type,
+                participant_descriptions={agent.name: agent.description for agent in self._members},
+                exception_callback=exception_callback,
+                result_callback=result_callback,
+                max_messages=self._max_messages,
+            ),
+        )
+
+
+class BoundedChatHistory:
+    """A ring buffer of the last `max_recent` messages, plus per agent summaries of the older ones."""
+
+    def __init__(self, max_recent: int = 20):
+        self._recent: deque[TranscriptRecord] = deque(maxlen=max_recent)
+        self._summaries: dict[str | None, TurnSummary] = {}
+        self.messages_seen = 0
+
+    @property
+    def recent(self) -> tuple[TranscriptRecord, ...]:
+        return tuple(self._recent)
+
+    @property
+    def last(self) -> TranscriptRecord | None:
+        return self._recent[-1] if self._recent else None
+
+    @property
+    def summaries(self) -> tuple[TurnSummary, ...]:
+        return tuple(self._summaries.values())
+
+    def add(self, message: ChatMessageContent) -> TranscriptRecord:
+        self.messages_seen += 1
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            self._summaries.setdefault(oldest.name, TurnSummary(name=oldest.name)).add(oldest)
+        record = TranscriptRecord.from_message(message, index=self.messages_seen)
+        self._recent.append(record)
+        return record
+
+    def extend(self, messages: Iterable[ChatMessageContent]) -> None:
+        for message in messages:
+            self.add(message)
+
+    def catch_up(self, chat_history: ChatHistory) -> None:
+        """Adds the messages of `chat_history` not seen yet, also when it is a `TrimmedChatHistory`."""
+        total = messages_added(chat_history)
+        new = min(total - self.messages_seen, len(chat_history.messages))
+        if new > 0:
+            self.extend(chat_history.messages[-new:])
+
+    def summary_text(self) -> str:
+        older = ", ".join(
+            f"{summary.name or '*'}: {summary.turns} turns ({summary.chars} chars, "
+            f"messages {summary.first_index}-{summary.last_index})"
+            for summary in self._summaries.values()
+        )
+        return f"{self.messages_seen} messages, last {len(self._recent)} kept" + (f"; older: {older}" if older else "")
+
+
+def _simulated_message(round_number: int) -> ChatMessageContent:
+    name = "CopyWriter" if round_number % 2 else "ArtDirector"
+    # Roughly the size of a real answer, plus a service response kept in `inner_content`.
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, name=name, content=f"Round {round_number}: " + "slogan " * 200,
+                              inner_content={"raw": "x" * 4096})
+
+
+async def profile(rounds: int, max_messages: int, every: int, unbounded: bool) -> None:
+    """
+    Grows a chat history the way the manager actor does: a "Transferred to" message and the answer each round, then a
+    deep copy handed to `ApprovalGroupChatManager.should_terminate`. Prints the memory and the time of the last rounds.
+    """
+    from agent_example_05 import ApprovalGroupChatManager
+
+    manager = ApprovalGroupChatManager(approver_name="Nobody", max_rounds=rounds)
+    chat_history = ChatHistory() if unbounded else TrimmedChatHistory(max_messages=max_messages)
+    chat_history.add_message(ChatMessageContent(role=AuthorRole.USER, content="a slogan for a new line of electric cars."))
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for round_number in range(1, rounds + 1):
+        message = _simulated_message(round_number)
+        chat_history.add_message(ChatMessageContent(role=AuthorRole.USER, content=f"Transferred to {message.name}"))
+        chat_history.add_message(message)
+        await manager.should_terminate(chat_history.model_copy(deep=True))
+        if round_number % every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            elapsed, started = time.perf_counter() - started, time.perf_counter()
+            print(f"round {round_number:>5}: {(current - baseline) / 1024:8.1f} KiB  (peak {(peak - baseline) / 1024:8.1f} KiB)"
+                  f"  {elapsed / every * 1000:6.2f} ms/round")
+    tracemalloc.stop()
+    print(f"{len(chat_history.messages)} messages in the chat history; kept by the manager: {manager.history.summary_text()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory profile of the bounded chat history.")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--max-messages", type=int, default=40)
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--unbounded", action="store_true", help="Use a plain ChatHistory, to compare.")
+    args = parser.parse_args()
+    asyncio.run(profile(args.rounds, args.max_messages, args.every, args.unbounded))
@@ -0,0 +1,415 @@
+"""
+Open-loop load generator for the agent flows of example 00 and example 04.
+
+Running the examples one request after another (closed loop) hides queueing: a slow response just delays
+the next request, so latency looks fine while throughput silently drops.
+This script sends requests at a fixed target rate with Poisson arrivals (exponential gaps between requests),
+whether or not the previous requests have finished, like real users would.
+
+For every target rate it records HDR-style latency histograms (end-to-end and per phase of the flow),
+and reports the achieved throughput, the error rate and the throttle rate (HTTP 429 / `rate_limit_exceeded`).
+The saturation throughput is the highest achieved throughput of the rates that stayed healthy.
+
+Latencies are measured from the moment the request *should* have been sent, not from when it was sent,
+so a stalled client does not hide its own delay (the "coordinated omission" problem).
+
+Usage:
+    uv run load_generator.py --flow 00 --rates 0.5,1,2 --duration 60
+    uv run load_generator.py --flow 04 --rates 0.2,0.5 --duration 120
+
+You need the environment variables set in your .env file for this script to work:
+* AZURE_AI_AGENT_ENDPOINT
+* AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME
+
+"""
+
+# # HdrHistogram, the idea behind the latency histogram used here:
+# http://hdrhistogram.org/
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import re
+import time
+from collections.abc import Generator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+from dotenv import load_dotenv
+
+from azure.core.exceptions import HttpResponseError
+from azure.identity.aio import DefaultAzureCredential
+
+from run_executor import FailureKind, classify_error_code
+
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    A small HDR-style histogram: values are recorded in microseconds with a fixed number of significant digits,
+    so memory stays bounded no matter how many samples are recorded, and percentiles keep the same relative precision
+    from milliseconds to minutes.
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        # Values below `_sub_bucket_count` are stored exactly, bigger ones lose the lowest bits.
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10**significant_figures))
+        self._counts: dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def _bucket(self, value_us: int) -> int:
+        shift = max(0, value_us.bit_length() - self._sub_bucket_bits)
+        return (value_us >> shift) << shift
+
+    def _highest_equivalent(self, bucket: int) -> int:
+        shift = max(0, bucket.bit_length() - self._sub_bucket_bits)
+        return bucket + (1 << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        value_us = max(0, round(seconds * 1_000_000))
+        bucket = self._bucket(value_us)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.min_us = value_us if self.count == 0 else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+        self.count += 1
+        self.total_us += value_us
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.count == 0:
+            return
+        for bucket, count in other._counts.items():
+            self._counts[bucket] = self._counts.get(bucket, 0) + count
+        self.min_us = other.min_us if self.count == 0 else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+
+    def percentile(self, percentile: float) -> float:
+        """Returns the value (in seconds) at the given percentile, 0 if nothing was recorded."""
+        if self.count == 0:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= target:
+                return min(self._highest_equivalent(bucket), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def mean(self) -> float:
+        return self.total_us / self.count / 1_000_000 if self.count else 0.0
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "no samples"
+        values = "  ".join(f"p{p:g}={self.percentile(p) * 1000:.0f}ms" for p in PERCENTILES)
+        return f"n={self.count}  mean={self.mean() * 1000:.0f}ms  {values}  max={self.max_us / 1000:.0f}ms"
+
+
+class Sample:
+    """Timings of a single request: the phases of the flow, filled in by the flow while it runs."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+
+class Flow(Protocol):
+    name: str
+
+    async def setup(self) -> None: ...
+
+    async def request(self, sample: Sample) -> None: ...
+
+    async def teardown(self) -> None: ...
+
+
+# Semantic Kernel wraps a failed run in its own exception, with the run error message in the text,
+# e.g. "... with error: Rate limit is exceeded. Try again in 20 seconds."
+_RATE_LIMIT_PATTERN = re.compile(r"rate[ _]limit", re.IGNORECASE)
+
+
+class ThrottledError(Exception):
+    """The service asked us to slow down."""
+
+
+class RunFailedError(Exception):
+    """The run finished with status `failed`."""
+
+
+def is_throttle(error: BaseException) -> bool:
+    """
+    Walks the exception chain looking for an HTTP 429 or a `rate_limit_exceeded` run error.
+    Exceptions without a status code (the ones raised by Semantic Kernel in flow 04) are matched on their message.
+    """
+    current: BaseException | None = error
+    while current is not None:
+        if isinstance(current, ThrottledError):
+            return True
+        if isinstance(current, HttpResponseError) and current.status_code == 429:
+            return True
+        if _RATE_LIMIT_PATTERN.search(str(current)):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+class Example00Flow:
+    """The flow of agent_example_00: thread, message, run, read the answer, delete the thread."""
+
+    name = "00"
+
+    def __init__(self, endpoint: str, model_deployment_name: str, content: str = "What can you do for me?"):
+        from azure.ai.agents.aio import AgentsClient
+
+        self._credential = DefaultAzureCredential()
+        self._client = AgentsClient(endpoint=endpoint, credential=self._credential)
+        self._model_deployment_name = model_deployment_name
+        self._content = content
+        self._agent_id = ""
+
+    async def setup(self) -> None:
+        agent = await self._client.create_agent(
+            model=self._model_deployment_name,
+            name="Load test assistant",
+            instructions="Answer the user's questions.",
+        )
+        self._agent_id = agent.id
+        print(f"Agent created with ID: {agent.id}")
+
+    async def request(self, sample: Sample) -> None:
+        with sample.phase("thread"):
+            thread = await self._client.threads.create()
+        try:
+            with sample.phase("message"):
+                await self._client.messages.create(thread_id=thread.id, role="user", content=self._content)
+            with sample.phase("run"):
+                run = await self._client.runs.create_and_process(thread_id=thread.id, agent_id=self._agent_id)
+            if run.status == "failed":
+                last_error: Mapping[str, Any] = run.last_error or {}
+                code: str | None = last_error.get("code")
+                if classify_error_code(code) is FailureKind.THROTTLE:
+                    raise ThrottledError(run.last_error)
+                raise RunFailedError(run.last_error)
+            with sample.phase("response"):
+                async for _ in self._client.messages.list(thread_id=thread.id, run_id=run.id):
+                    pass
+        finally:
+            with sample.phase("cleanup"):
+                await self._client.threads.delete(thread.id)
+
+    async def teardown(self) -> None:
+        if self._agent_id:
+            await self._client.delete_agent(self._agent_id)
+            print(f"Deleted agent with ID: {self._agent_id}")
+        await self._client.close()
+        await self._credential.close()
+
+
+class Example04Flow:
+    """The flow of agent_example_04: a Semantic Kernel agent with the weather plugin, one conversation per request."""
+
+    name = "04"
+
+    def __init__(self):
+        from semantic_kernel.agents import AzureAIAgent, AzureAIAgentSettings
+
+        self._settings = AzureAIAgentSettings()
+        self._credential = DefaultAzureCredential()
+        self._client = AzureAIAgent.create_client(credential=self._credential, endpoint=self._settings.endpoint)
+        self._agent: AzureAIAgent | None = None
+
+    async def setup(self) -> None:
+        from semantic_kernel.agents import AzureAIAgent
+
+        from agent_example_04 import WeatherPlugin
+
+        agent_definition = await self._client.agents.create_agent(
+            model=self._settings.model_deployment_name,
+            name="WeatherAgent",
+            instructions="Answer the user's questions about the weather.",
+        )
+        self._agent = AzureAIAgent(client=self._client, definition=agent_definition, plugins=[WeatherPlugin()])
+        print(f"Agent created with ID: {agent_definition.id}")
+
+    async def request(self, sample: Sample) -> None:
+        from semantic_kernel.agents import AgentThread
+
+        from agent_example_04 import USER_INPUTS
+
+        assert self._agent is not None
+        thread: AgentThread | None = None
+        try:
+            for turn, user_input in enumerate(USER_INPUTS, start=1):
+                with sample.phase(f"turn_{turn}"):
+                    response = await self._agent.get_response(messages=user_input, thread=thread)
+                thread = response.thread
+        finally:
+            if thread:
+                with sample.phase("cleanup"):
+                    await thread.delete()
+
+    async def teardown(self) -> None:
+        if self._agent is not None:
+            await self._client.agents.delete_agent(self._agent.id)
+            print(f"Deleted agent with ID: {self._agent.id}")
+        await self._client.close()
+        await self._credential.close()
+
+
+@dataclass
+class StepResult:
+    """Everything measured while running at one target rate."""
+
+    rate: float
+    duration: float
+    sent: int = 0
+    succeeded: int = 0
+    errors: int = 0
+    throttled: int = 0
+    dropped: int = 0
+    elapsed: float = 0.0
+    end_to_end: LatencyHistogram = field(default_factory=LatencyHistogram)
+    phases: dict[str, LatencyHistogram] = field(default_factory=lambda: {})
+
+    @property
+    def throughput(self) -> float:
+        return self.succeeded / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return (self.errors + self.dropped) / self.sent if self.sent else 0.0
+
+    @property
+    def throttle_rate(self) -> float:
+        return self.throttled / self.sent if self.sent else 0.0
+
+    def is_healthy(self, max_failure_rate: float) -> bool:
+        """Healthy means the service kept up: requests were served and few of them failed, were throttled or dropped."""
+        return self.succeeded > 0 and self.error_rate + self.throttle_rate <= max_failure_rate
+
+    def record(self, sample: Sample, latency: float) -> None:
+        self.end_to_end.record(latency)
+        for name, seconds in sample.phases.items():
+            self.phases.setdefault(name, LatencyHistogram()).record(seconds)
+
+
+async def _send(flow: Flow, intended_start: float, result: StepResult) -> None:
+    sample = Sample()
+    try:
+        await flow.request(sample)
+    except Exception as error:
+        if is_throttle(error):
+            result.throttled += 1
+        else:
+            result.errors += 1
+            print(f"Request failed: {error!r}")
+        return
+    # Measured from the scheduled send time, so time spent waiting to be sent counts too.
+    result.record(sample, time.perf_counter() - intended_start)
+    result.succeeded += 1
+
+
+async def run_step(flow: Flow, rate: float, duration: float, max_in_flight: int,
+                   drain_timeout: float, rng: random.Random) -> StepResult:
+    """Sends requests with Poisson arrivals at `rate` requests/sec for `duration` seconds, then waits for the stragglers."""
+    result = StepResult(rate=rate, duration=duration)
+    in_flight: set[asyncio.Task[None]] = set()
+    start = time.perf_counter()
+    next_send = start
+
+    while True:
+        next_send += rng.expovariate(rate)
+        if next_send - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        result.sent += 1
+        if len(in_flight) >= max_in_flight:
+            # Open loop: never wait for a free slot, count the request as lost instead.
+            result.dropped += 1
+            continue
+        task = asyncio.create_task(_send(flow, next_send, result))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        _, pending = await asyncio.wait(in_flight, timeout=drain_timeout)
+        for task in pending:
+            task.cancel()
+        # Let the cancelled requests run their cleanup (delete their threads) before the flow is torn down.
+        await asyncio.gather(*pending, return_exceptions=True)
+        result.errors += len(pending)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def print_step(result: StepResult) -> None:
+    print(f"\n***** Target rate {result.rate:g} req/s for {result.duration:g}s *****")
+    print(f"sent={result.sent}  ok={result.succeeded}  errors={result.errors}  "
+          f"throttled={result.throttled}  dropped={result.dropped}")
+    print(f"achieved throughput: {result.throughput:.2f} req/s  "
+          f"error rate: {result.error_rate:.1%}  throttle rate: {result.throttle_rate:.1%}")
+    print(f"end-to-end  {result.end_to_end.summary()}")
+    for name, histogram in result.phases.items():
+        print(f"  {name:<10}{histogram.summary()}")
+
+
+def saturation_throughput(results: list[StepResult], max_failure_rate: float) -> float:
+    """The highest throughput reached by a rate that stayed healthy."""
+    healthy = [result.throughput for result in results if result.is_healthy(max_failure_rate)]
+    return max(healthy, default=0.0)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the agent examples.")
+    parser.add_argument("--flow", choices=["00", "04"], default="00", help="Which example flow to drive.")
+    parser.add_argument("--rates", default="0.5,1,2", help="Comma separated target rates, in requests/sec.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to send requests at each rate.")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Requests in flight before new ones are dropped.")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Seconds to wait for in-flight requests.")
+    parser.add_argument("--max-failure-rate", type=float, default=0.01,
+                        help="Errors + throttles allowed for a rate to count towards the saturation throughput.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the arrival times.")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    flow: Flow
+    if args.flow == "00":
+        flow = Example00Flow(endpoint=os.environ["AZURE_AI_AGENT_ENDPOINT"],
+                             model_deployment_name=os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"])
+    else:
+        flow = Example04Flow()
+
+    rng = random.Random(args.seed)
+    results: list[StepResult] = []
+    await flow.setup()
+    try:
+        for rate in (float(value) for value in args.rates.split(",")):
+            result = await run_step(flow, rate, args.duration, args.max_in_flight, args.drain_timeout, rng)
+            print_step(result)
+            results.append(result)
+    finally:
+        await flow.teardown()
+
+    print(f"\n***** Saturation throughput (flow {flow.name}): "
+          f"{saturation_throughput(results, args.max_failure_rate):.2f} req/s *****")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,476 @@
+"""
+A resilient run executor for the Azure AI Agent service.
+
+The examples call `runs.create_and_process` once and, when `run.status == "failed"`, just print `run.last_error`.
+Under load most of those failures are temporary (throttling, server errors), so the work is simply lost.
+
+`RunExecutor` wraps `runs.create_and_process`:
+* It classifies the status and `last_error` code of a finished run (and the HTTP errors raised by the client) as
+  throttle, transient or permanent. Only `completed` runs (and `requires_action`, for the caller) are successes.
+* Throttle and transient failures (including `expired` runs) are retried in a new run on the same thread,
+  waiting a capped, jittered exponential backoff between attempts (or the `Retry-After` the service asked for).
+  A thread takes one active run at a time: when an attempt raised after its run was created (e.g. while polling it),
+  that run is cancelled, and the retry waits for it to stop. If it doesn't stop, the error is raised instead.
+* A circuit breaker watches the failure rate of the recent runs. When it spikes, the breaker opens and new runs are
+  rejected straight away (`CircuitOpenError`) instead of piling more load on a struggling service.
+  After a cool down one probe run is let through; if it succeeds the breaker closes again.
+* Retry counts, failures by code and the breaker state are available with `metrics()`.
+
+It works with the sync `AgentsClient` (`run`) and the async one from `azure.ai.agents.aio` (`arun`).
+Pass a `RunWaiter` (see run_waiter.py) to wait for each run with adaptive polling instead of `create_and_process`,
+and a `RateLimiter` to pace the runs started (and back off together when throttled) across workers.
+
+Usage:
+    run_executor = RunExecutor()
+    run = run_executor.run(agent_client, thread_id=thread.id, agent_id=agent.id)
+    print(run_executor.metrics())
+"""
+
+# # Exponential backoff and jitter:
+# https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+
+# # Circuit breaker pattern:
+# https://learn.microsoft.com/en-us/azure/architecture/patterns/circuit-breaker
+
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Any, Protocol
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+from run_waiter import RunWaiter
+
+
+class FailureKind(Enum):
+    THROTTLE = "throttle"
+    TRANSIENT = "transient"
+    PERMANENT = "permanent"
+
+
+# Run statuses that are not a failure (`requires_action` is returned by the run waiter for the caller to handle),
+# and the ones worth retrying in a new run.
+SUCCESS_STATUSES = frozenset({"completed", "requires_action"})
+TRANSIENT_STATUSES = frozenset({"expired"})
+# Statuses of a run that still holds its thread: no new run can be created on it.
+ACTIVE_STATUSES = frozenset({"queued", "in_progress", "requires_action", "cancelling"})
+
+# Seconds between the status polls of a run being cancelled.
+_SETTLE_POLL_INTERVAL = 0.5
+
+# `last_error.code` values of a failed run that are worth retrying.
+THROTTLE_ERROR_CODES = frozenset({"rate_limit_exceeded"})
+TRANSIENT_ERROR_CODES = frozenset({"server_error", "internal_error", "service_unavailable", "timeout"})
+
+# HTTP status codes raised by the client that are worth retrying.
+THROTTLE_STATUS_CODES = frozenset({429})
+TRANSIENT_STATUS_CODES = frozenset({408, 500, 502, 503, 504})
+
+# e.g. "Rate limit is exceeded. Try again in 20 seconds."
+_RETRY_AFTER_PATTERN = re.compile(r"try again in (\d+(?:\.\d+)?) seconds?", re.IGNORECASE)
+
+
+def classify_error_code(code: str | None) -> FailureKind:
+    """Classifies the `last_error.code` of a failed run."""
+    if code in THROTTLE_ERROR_CODES:
+        return FailureKind.THROTTLE
+    if code in TRANSIENT_ERROR_CODES:
+        return FailureKind.TRANSIENT
+    return FailureKind.PERMANENT
+
+
+def classify_exception(error: BaseException) -> FailureKind:
+    """Classifies an exception raised by the client while creating or polling a run."""
+    if isinstance(error, HttpResponseError) and error.status_code is not None:
+        if error.status_code in THROTTLE_STATUS_CODES:
+            return FailureKind.THROTTLE
+        if error.status_code in TRANSIENT_STATUS_CODES:
+            return FailureKind.TRANSIENT
+        return FailureKind.PERMANENT
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        # Connection problems: the request never got an answer.
+        return FailureKind.TRANSIENT
+    return FailureKind.PERMANENT
+
+
+def run_status(run: Any) -> str:
+    """The status of a run as a plain string (`str()` of the SDK enum gives "RunStatus.COMPLETED")."""
+    return getattr(run.status, "value", run.status)
+
+
+def classify_run(run: Any) -> FailureKind | None:
+    """None for a run that went fine, else the kind of failure, based on its status and `last_error.code`."""
+    status = run_status(run)
+    if status in SUCCESS_STATUSES:
+        return None
+    if status == "failed":
+        return classify_error_code(_error_code(run))
+    if status in TRANSIENT_STATUSES:
+        return FailureKind.TRANSIENT
+    # cancelled, incomplete...: not a success, but nothing a new run would fix.
+    return FailureKind.PERMANENT
+
+
+def _last_error(run: Any) -> Mapping[str, Any]:
+    """The `last_error` of a run (a `RunError`, which is a mapping), or an empty mapping."""
+    return run.last_error or {}
+
+
+def _error_code(run: Any) -> str:
+    if run_status(run) != "failed":
+        return run_status(run)
+    code: str | None = _last_error(run).get("code")
+    return code or "unknown"
+
+
+def _retry_after(run: Any) -> float | None:
+    """The wait the service asked for in the error message of a throttled run, if any."""
+    message: str | None = _last_error(run).get("message")
+    match = _RETRY_AFTER_PATTERN.search(message or "")
+    return float(match.group(1)) if match else None
+
+
+def _retry_after_header(error: BaseException) -> float | None:
+    """The wait the service asked for in the headers of a throttled response (`retry-after-ms` or `Retry-After`)."""
+    response = getattr(error, "response", None)
+    headers: Mapping[str, str] = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("Retry-After", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            pass
+        try:
+            # Retry-After can also be an HTTP date.
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class RateLimiter(Protocol):
+    def acquire(self) -> None:
+        """Blocks until a new run may start."""
+        ...
+
+    def penalize(self, seconds: float) -> None:
+        """Delays every run not started yet by `seconds`, after the service throttled us."""
+        ...
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open: the run was not started."""
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens when at least `failure_threshold` of the last `window_size` runs failed (and at least `min_runs` were seen),
+    stays open for `cooldown` seconds, then lets a single probe run through (half open).
+
+    `allow` hands out a token for each run it lets through, and the outcome is `record`ed with that token.
+    Outcomes of runs started before the breaker last opened or closed are stale and ignored, as are outcomes arriving
+    while it is open, or while half open from anything but the probe. `release` must be called once the run is over
+    (in a `finally`), so a probe that ended without an outcome frees the slot for the next one.
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, window_size: int = 20, min_runs: int = 5,
+                 cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.min_runs = min_runs
+        self.cooldown = cooldown
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._last_token = 0
+        # Tokens up to this one were handed out before the last state change.
+        self._stale_up_to = 0
+        self._probe: int | None = None
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+    def allow(self) -> int | None:
+        """A token if a new run may start, None otherwise. In half open state only one probe run gets a token."""
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                self._last_token += 1
+                return self._last_token
+            if state is CircuitState.HALF_OPEN and self._probe is None:
+                self._last_token += 1
+                self._probe = self._last_token
+                return self._probe
+            return None
+
+    def record(self, token: int, success: bool) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.HALF_OPEN:
+                if token != self._probe:
+                    return
+                self._probe = None
+                if success:
+                    self._state = CircuitState.CLOSED
+                    self._outcomes.clear()
+                    self._stale_up_to = self._last_token
+                else:
+                    self._open()
+                return
+            if state is CircuitState.OPEN or token <= self._stale_up_to:
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_runs and failures / len(self._outcomes) >= self.failure_threshold:
+                self._open()
+
+    def release(self, token: int) -> None:
+        with self._lock:
+            if token == self._probe:
+                self._probe = None
+
+    def _open(self) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._stale_up_to = self._last_token
+        self.times_opened += 1
+
+
+@dataclass
+class RunExecutorMetrics:
+    attempts: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    shed: int = 0
+    failures_by_code: dict[str, int] = field(default_factory=lambda: {})
+
+
+class RunExecutor:
+    """
+    Runs `runs.create_and_process` (or `run_waiter`, if given) with retries and a circuit breaker.
+
+    `max_retries` is the number of new runs started after the first one failed.
+    The backoff before retry `n` is a random value between 0 and `min(max_backoff, base_backoff * 2**n)` ("full jitter"),
+    but never shorter than the wait the service asked for in a throttled run's error message.
+    Before retrying after an exception, the run left active on the thread is cancelled, waiting up to `settle_timeout`
+    seconds for it to stop.
+    """
+
+    def __init__(self, max_retries: int = 3, base_backoff: float = 1.0, max_backoff: float = 30.0,
+                 circuit_breaker: CircuitBreaker | None = None, run_waiter: RunWaiter | None = None,
+                 rate_limiter: RateLimiter | None = None, rng: random.Random | None = None,
+                 settle_timeout: float = 60.0):
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.run_waiter = run_waiter
+        self.rate_limiter = rate_limiter
+        self.settle_timeout = settle_timeout
+        self._rng = rng or random.Random()
+        self._metrics = RunExecutorMetrics()
+        self._lock = threading.Lock()
+
+    def backoff(self, retry: int, retry_after: float | None = None) -> float:
+        delay = self._rng.uniform(0, min(self.max_backoff, self.base_backoff * 2**retry))
+        return max(delay, min(retry_after or 0.0, self.max_backoff))
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "attempts": self._metrics.attempts,
+                "succeeded": self._metrics.succeeded,
+                "failed": self._metrics.failed,
+                "retries": self._metrics.retries,
+                "shed": self._metrics.shed,
+                "failures_by_code": dict(self._metrics.failures_by_code),
+                "circuit_state": self.circuit_breaker.state.value,
+                "circuit_opened": self.circuit_breaker.times_opened,
+            }
+
+    def _start_attempt(self) -> int:
+        token = self.circuit_breaker.allow()
+        if token is None:
+            with self._lock:
+                self._metrics.shed += 1
+            raise CircuitOpenError("Circuit breaker is open, run not started.")
+        with self._lock:
+            self._metrics.attempts += 1
+        return token
+
+    def _record_failure(self, token: int, code: str, kind: FailureKind) -> None:
+        with self._lock:
+            self._metrics.failed += 1
+            self._metrics.failures_by_code[code] = self._metrics.failures_by_code.get(code, 0) + 1
+        # Permanent failures are a problem with the request, not with the health of the service.
+        if kind is not FailureKind.PERMANENT:
+            self.circuit_breaker.record(token, success=False)
+
+    def _record_success(self, token: int) -> None:
+        with self._lock:
+            self._metrics.succeeded += 1
+        self.circuit_breaker.record(token, success=True)
+
+    def _next_delay(self, retry: int, kind: FailureKind, retry_after: float | None = None) -> float | None:
+        """The wait before the next attempt, or None if the failure should not be retried."""
+        if kind is FailureKind.PERMANENT or retry >= self.max_retries:
+            return None
+        with self._lock:
+            self._metrics.retries += 1
+        delay = self.backoff(retry, retry_after)
+        if kind is FailureKind.THROTTLE and self.rate_limiter:
+            self.rate_limiter.penalize(delay)
+        return delay
+
+    def _on_run(self, run: Any, retry: int, token: int) -> float | None:
+        kind = classify_run(run)
+        if kind is None:
+            self._record_success(token)
+            return None
+        self._record_failure(token, _error_code(run), kind)
+        return self._next_delay(retry, kind, _retry_after(run) if kind is FailureKind.THROTTLE else None)
+
+    def _on_exception(self, error: Exception, retry: int, token: int) -> float | None:
+        kind = classify_exception(error)
+        code = f"http_{error.status_code}" if isinstance(error, HttpResponseError) else type(error).__name__
+        self._record_failure(token, code, kind)
+        return self._next_delay(retry, kind, _retry_after_header(error) if kind is FailureKind.THROTTLE else None)
+
+    def _settle_thread(self, client: Any, thread_id: str) -> bool:
+        """
+        Cancels the last run of the thread if it is still active, and waits until it stops.
+        False if the thread may still have an active run, so a new one can't be created yet.
+        """
+        try:
+            run = next(iter(client.runs.list(thread_id=thread_id, limit=1, order="desc")), None)
+            if run is None or run_status(run) not in ACTIVE_STATUSES:
+                return True
+            print(f"Cancelling run {run.id}, still {run_status(run)} on thread {thread_id}")
+            if run_status(run) != "cancelling":
+                try:
+                    client.runs.cancel(thread_id=thread_id, run_id=run.id)
+                except HttpResponseError:
+                    # It may have finished meanwhile: its status tells.
+                    pass
+            deadline = time.monotonic() + self.settle_timeout
+            while time.monotonic() < deadline:
+                time.sleep(_SETTLE_POLL_INTERVAL)
+                run = client.runs.get(thread_id=thread_id, run_id=run.id)
+                if run_status(run) not in ACTIVE_STATUSES:
+                    return True
+        except Exception as error:
+            print(f"Could not check the runs of thread {thread_id}: {error!r}")
+        return False
+
+    async def _asettle_thread(self, client: Any, thread_id: str) -> bool:
+        """Same as `_settle_thread`, for the async `AgentsClient`."""
+        try:
+            run = None
+            async for last in client.runs.list(thread_id=thread_id, limit=1, order="desc"):
+                run = last
+                break
+            if run is None or run_status(run) not in ACTIVE_STATUSES:
+                return True
+            print(f"Cancelling run {run.id}, still {run_status(run)} on thread {thread_id}")
+            if run_status(run) != "cancelling":
+                try:
+                    await client.runs.cancel(thread_id=thread_id, run_id=run.id)
+                except HttpResponseError:
+                    pass
+            deadline = time.monotonic() + self.settle_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(_SETTLE_POLL_INTERVAL)
+                run = await client.runs.get(thread_id=thread_id, run_id=run.id)
+                if run_status(run) not in ACTIVE_STATUSES:
+                    return True
+        except Exception as error:
+            print(f"Could not check the runs of thread {thread_id}: {error!r}")
+        return False
+
+    def run(self, client: Any, thread_id: str, agent_id: str, **kwargs: Any) -> Any:
+        """
+        Creates and processes a run with the sync `AgentsClient`, retrying transient failures in new runs on the same
+        thread. Returns the last run, which may still be unsuccessful if the error was permanent or retries ran out.
+        """
+        retry = 0
+        while True:
+            token = self._start_attempt()
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                try:
+                    if self.run_waiter:
+                        run = self.run_waiter.create_and_wait(client, thread_id=thread_id, agent_id=agent_id,
+                                                              **kwargs)
+                    else:
+                        run = client.runs.create_and_process(thread_id=thread_id, agent_id=agent_id, **kwargs)
+                except Exception as error:
+                    delay = self._on_exception(error, retry, token)
+                    # The run may have been created before the error: it must stop before a new one can start.
+                    if delay is None or not self._settle_thread(client, thread_id):
+                        raise
+                else:
+                    delay = self._on_run(run, retry, token)
+                    if delay is None:
+                        return run
+                    print(f"Run {run.id} ended with {_error_code(run)}, retrying in {delay:.1f}s")
+            finally:
+                # Frees the half open probe slot if the attempt ended without an outcome (e.g. KeyboardInterrupt).
+                self.circuit_breaker.release(token)
+            time.sleep(delay)
+            retry += 1
+
+    async def arun(self, client: Any, thread_id: str, agent_id: str, **kwargs: Any) -> Any:
+        """Same as `run`, for the async `AgentsClient` of `azure.ai.agents.aio`."""
+        retry = 0
+        while True:
+            token = self._start_attempt()
+            try:
+                if self.rate_limiter:
+                    await asyncio.to_thread(self.rate_limiter.acquire)
+                try:
+                    if self.run_waiter:
+                        run = await self.run_waiter.acreate_and_wait(client, thread_id=thread_id, agent_id=agent_id,
+                                                                     **kwargs)
+                    else:
+                        run = await client.runs.create_and_process(thread_id=thread_id, agent_id=agent_id, **kwargs)
+                except Exception as error:
+                    delay = self._on_exception(error, retry, token)
+                    if delay is None or not await self._asettle_thread(client, thread_id):
+                        raise
+                else:
+                    delay = self._on_run(run, retry, token)
+                    if delay is None:
+                        return run
+                    print(f"Run {run.id} ended with {_error_code(run)}, retrying in {delay:.1f}s")
+            finally:
+                # Frees the half open probe slot if the attempt was cancelled.
+                self.circuit_breaker.release(token)
+            await asyncio.sleep(delay)
+            retry += 1
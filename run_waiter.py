@@ -0,0 +1,181 @@
+"""
+Adaptive polling for run completion.
+
+`runs.create_and_process` polls the run status at a fixed interval (1 second by default):
+a short run waits out the whole interval before we notice it finished, and a long run generates a GET every second.
+
+`RunWaiter` creates the run with `runs.create` and polls `runs.get` with an adaptive interval instead:
+* The first polls are fast (`initial_interval`), then the interval grows exponentially (`growth`) up to `max_interval`.
+* Once a few runs have finished, the durations seen so far are used as hints:
+  no polls are made before the fastest runs usually finish, and the next poll is moved forward to the next
+  typical completion time (p10, p25, p50, p75, p90 of the observed durations) when that is sooner.
+
+For every run it records the number of status polls and the latency added by polling (the time between the run
+finishing on the service and us noticing it). Both the sync `AgentsClient` (`create_and_wait`) and the async one from
+`azure.ai.agents.aio` (`acreate_and_wait`) are supported.
+
+A status poll that fails with a transient error (a timeout, 429 or 5xx response, or a connection error) is retried
+at the next interval, up to `max_poll_errors` times in a row. When polling gives up, the run is cancelled (best effort)
+before the error is raised, so it does not keep running, and billing, on the service with nobody waiting for it.
+
+Unlike `create_and_process`, tool calls are not executed: a run that stops in `requires_action` is returned as is.
+The examples only use server side tools (Bing, connected agents), so their runs never stop there.
+
+Usage:
+    run_waiter = RunWaiter()
+    run = run_waiter.create_and_wait(agent_client, thread_id=thread.id, agent_id=agent.id)
+    print(run_waiter.last_stats)
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+# Statuses after which the run will not change any more (or needs the caller to act).
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"})
+
+HINT_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+
+# HTTP status codes of a status poll worth retrying.
+TRANSIENT_POLL_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_transient_poll_error(error: Exception) -> bool:
+    """Whether a failed `runs.get` is worth retrying: a connection error, a timeout, a 429 or a 5xx response."""
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True
+    return isinstance(error, HttpResponseError) and error.status_code in TRANSIENT_POLL_STATUS_CODES
+
+
+@dataclass
+class RunWaitStats:
+    run_id: str
+    status: str
+    polls: int
+    duration: float
+    added_latency: float
+
+    def __str__(self) -> str:
+        return (f"run {self.run_id}: {self.status} after {self.duration:.2f}s, "
+                f"{self.polls} status polls, ~{self.added_latency:.2f}s added by polling")
+
+
+class RunWaiter:
+    """Waits for runs with an adaptive polling interval, learning from the durations of the previous runs."""
+
+    def __init__(self, initial_interval: float = 0.25, growth: float = 1.5, max_interval: float = 5.0,
+                 history_size: int = 100, min_history: int = 5, max_poll_errors: int = 3):
+        self.initial_interval = initial_interval
+        self.growth = growth
+        self.max_interval = max_interval
+        self.min_history = min_history
+        self.max_poll_errors = max_poll_errors
+        self._durations: deque[float] = deque(maxlen=history_size)
+        self._stats: deque[RunWaitStats] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    @property
+    def last_stats(self) -> RunWaitStats | None:
+        with self._lock:
+            return self._stats[-1] if self._stats else None
+
+    def stats(self) -> list[RunWaitStats]:
+        with self._lock:
+            return list(self._stats)
+
+    def _hints(self) -> list[float]:
+        with self._lock:
+            if len(self._durations) < self.min_history:
+                return []
+            durations = sorted(self._durations)
+        return [durations[int(q * (len(durations) - 1))] for q in HINT_QUANTILES]
+
+    def next_interval(self, elapsed: float, poll: int) -> float:
+        """How long to wait before poll number `poll` (0 based), `elapsed` seconds after the run was created."""
+        interval = min(self.max_interval, self.initial_interval * self.growth**poll)
+        hints = self._hints()
+        if not hints:
+            return interval
+        if elapsed < hints[0]:
+            # Hardly any run finishes this early: skip the polls until the fastest ones usually do.
+            return min(self.max_interval, max(interval, hints[0] - elapsed))
+        index = bisect.bisect_right(hints, elapsed + self.initial_interval)
+        if index < len(hints):
+            # Poll again around the next typical completion time, if that comes sooner.
+            return min(interval, max(self.initial_interval, hints[index] - elapsed))
+        return interval
+
+    def _finish(self, run: Any, created: float, polls: int, last_interval: float) -> None:
+        observed = time.monotonic()
+        duration = observed - created
+        # Without a service timestamp the run finished somewhere during the last interval: assume the middle.
+        added_latency = last_interval / 2
+        finished_at: datetime | None = run.completed_at or run.failed_at or run.cancelled_at
+        if finished_at is not None:
+            behind = (datetime.now(timezone.utc) - finished_at).total_seconds()
+            added_latency = min(last_interval, max(0.0, behind))
+        stats = RunWaitStats(run_id=run.id, status=getattr(run.status, "value", run.status), polls=polls, duration=duration,
+                             added_latency=added_latency)
+        with self._lock:
+            self._durations.append(duration - added_latency)
+            self._stats.append(stats)
+
+    def _give_up(self, error: Exception, poll_errors: int) -> bool:
+        return poll_errors > self.max_poll_errors or not is_transient_poll_error(error)
+
+    def create_and_wait(self, client: Any, thread_id: str, agent_id: str, **kwargs: Any) -> Any:
+        """Creates a run with the sync `AgentsClient` and polls it until it reaches a terminal status."""
+        run = client.runs.create(thread_id=thread_id, agent_id=agent_id, **kwargs)
+        created = time.monotonic()
+        polls = 0
+        poll_errors = 0
+        interval = 0.0
+        while run.status not in TERMINAL_STATUSES:
+            interval = self.next_interval(time.monotonic() - created, polls)
+            time.sleep(interval)
+            polls += 1
+            try:
+                run = client.runs.get(thread_id=thread_id, run_id=run.id)
+                poll_errors = 0
+            except Exception as error:
+                poll_errors += 1
+                if self._give_up(error, poll_errors):
+                    try:
+                        client.runs.cancel(thread_id=thread_id, run_id=run.id)
+                    except Exception:
+                        pass
+                    raise
+        self._finish(run, created, polls, interval)
+        return run
+
+    async def acreate_and_wait(self, client: Any, thread_id: str, agent_id: str, **kwargs: Any) -> Any:
+        """Same as `create_and_wait`, for the async `AgentsClient` of `azure.ai.agents.aio`."""
+        run = await client.runs.create(thread_id=thread_id, agent_id=agent_id, **kwargs)
+        created = time.monotonic()
+        polls = 0
+        poll_errors = 0
+        interval = 0.0
+        while run.status not in TERMINAL_STATUSES:
+            interval = self.next_interval(time.monotonic() - created, polls)
+            await asyncio.sleep(interval)
+            polls += 1
+            try:
+                run = await client.runs.get(thread_id=thread_id, run_id=run.id)
+                poll_errors = 0
+            except Exception as error:
+                poll_errors += 1
+                if self._give_up(error, poll_errors):
+                    try:
+                        await client.runs.cancel(thread_id=thread_id, run_id=run.id)
+                    except Exception:
+                        pass
+                    raise
+        self._finish(run, created, polls, interval)
+        return run
@@ -0,0 +1,222 @@
+"""
+Multi-process sharded execution of large prompt workloads, with the flow of example 00.
+
+A single Python process driving the sync `AgentsClient` tops out well below the service quota:
+deserializing the JSON responses and printing are bound by the GIL, so more threads don't help.
+
+This script splits the prompts into shards and runs each shard in its own process of a process pool.
+Every worker has its own `AgentsClient` and credential, and runs the prompts of its shard one after another
+with the run executor (retries, circuit breaker and adaptive polling, see run_executor.py).
+The workers share a rate limiter: starting a run takes the next free slot of a global rate (`--rate`),
+and a throttled run pushes the next slot back for every worker, not only for the one that was throttled.
+The results are merged back in the order of the prompts, and only the main process prints or writes them.
+A prompt that fails (an exception of the client, or a run shed by the circuit breaker) gets a result with the status
+`error` or `shed` instead of failing its whole shard.
+
+With `--processes 1,2,4,8` the whole workload is run once per process count, and the throughput scaling is reported.
+The throughput only counts the completed prompts: failing fast is not going faster.
+
+Usage:
+    uv run sharded_runner.py --prompts prompts.txt --processes 4 --output answers.jsonl
+    uv run sharded_runner.py --repeat 64 --processes 1,2,4,8
+
+You need the environment variables set in your .env file for this script to work:
+* AZURE_AI_AGENT_ENDPOINT
+* AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME
+
+"""
+
+# # ProcessPoolExecutor:
+# https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from dotenv import load_dotenv
+
+from azure.ai.agents import AgentsClient
+from azure.identity import DefaultAzureCredential
+
+from run_executor import CircuitOpenError, RunExecutor, run_status
+from run_waiter import RunWaiter
+
+
+class SharedRateLimiter:
+    """
+    A rate limiter shared by the processes of a pool: a slot every `1 / rate` seconds, handed out in order.
+    The time of the next free slot lives in shared memory; `time.monotonic` is the same clock for every process.
+    Without a rate (0), there is no wait between slots, but a throttled run still holds every worker back.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next_slot = multiprocessing.Value("d", 0.0)
+
+    def acquire(self) -> None:
+        with self._next_slot.get_lock():
+            now = time.monotonic()
+            slot = max(now, self._next_slot.value)
+            if self._interval:
+                self._next_slot.value = slot + self._interval
+        time.sleep(max(0.0, slot - now))
+
+    def penalize(self, seconds: float) -> None:
+        with self._next_slot.get_lock():
+            self._next_slot.value = max(self._next_slot.value, time.monotonic() + seconds)
+
+
+@dataclass(slots=True)
+class PromptResult:
+    index: int
+    prompt: str
+    status: str
+    answer: str
+    seconds: float
+    worker: int
+
+
+class _Worker:
+    """The client, credential and run executor of one worker process."""
+
+    def __init__(self, endpoint: str, agent_id: str, rate_limiter: SharedRateLimiter):
+        self.credential = DefaultAzureCredential()
+        self.client = AgentsClient(endpoint=endpoint, credential=self.credential)
+        self.agent_id = agent_id
+        self.run_executor = RunExecutor(run_waiter=RunWaiter(), rate_limiter=rate_limiter)
+
+    def run_prompt(self, index: int, prompt: str) -> PromptResult:
+        start = time.perf_counter()
+        try:
+            status, answer = self._run(prompt)
+        except CircuitOpenError as error:
+            status, answer = "shed", str(error)
+        except Exception as error:
+            status, answer = "error", f"{type(error).__name__}: {error}"
+        return PromptResult(index, prompt, status, answer, time.perf_counter() - start, os.getpid())
+
+    def _run(self, prompt: str) -> tuple[str, str]:
+        thread = self.client.threads.create()
+        try:
+            self.client.messages.create(thread_id=thread.id, role="user", content=prompt)
+            run = self.run_executor.run(self.client, thread_id=thread.id, agent_id=self.agent_id)
+            if run.status == "failed":
+                return run_status(run), str(run.last_error)
+            answer = "\n".join(
+                text_message.text.value
+                for msg in self.client.messages.list(thread_id=thread.id, run_id=run.id)
+                if msg.role == "assistant"
+                for text_message in msg.text_messages
+            )
+            return run_status(run), answer
+        finally:
+            try:
+                self.client.threads.delete(thread.id)
+            except Exception:
+                # A thread left behind is not worth losing the answer, or the error that got us here.
+                pass
+
+
+_worker: _Worker | None = None
+
+
+def _init_worker(endpoint: str, agent_id: str, rate_limiter: SharedRateLimiter) -> None:
+    global _worker
+    _worker = _Worker(endpoint, agent_id, rate_limiter)
+
+
+def _run_shard(shard: list[tuple[int, str]]) -> list[PromptResult]:
+    assert _worker is not None, "The worker process was not initialized."
+    return [_worker.run_prompt(index, prompt) for index, prompt in shard]
+
+
+def shard_prompts(prompts: list[str], shards: int) -> list[list[tuple[int, str]]]:
+    """Deals the prompts round robin, so every shard gets a similar mix of the workload."""
+    indexed = list(enumerate(prompts))
+    return [indexed[shard::shards] for shard in range(shards) if indexed[shard::shards]]
+
+
+def run_sharded(endpoint: str, agent_id: str, prompts: list[str], processes: int, rate: float) -> list[PromptResult]:
+    """Runs the prompts on a pool of `processes` workers and returns the results in the order of the prompts."""
+    rate_limiter = SharedRateLimiter(rate)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(endpoint, agent_id, rate_limiter)) as pool:
+        shard_results = pool.map(_run_shard, shard_prompts(prompts, processes))
+        results = [result for shard in shard_results for result in shard]
+    return sorted(results, key=lambda result: result.index)
+
+
+def _read_prompts(path: str | None, repeat: int) -> list[str]:
+    if path is None:
+        return ["What can you do for me?"] * repeat
+    with open(path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def _write_results(results: list[PromptResult], path: str | None) -> None:
+    if path is None:
+        for result in results:
+            print(f"[{result.index}] ({result.status}) {result.prompt}\nAgent response: {result.answer}")
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        for result in results:
+            file.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+    print(f"Wrote {len(results)} results to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a prompt workload on a pool of processes.")
+    parser.add_argument("--prompts", help="File with one prompt per line.")
+    parser.add_argument("--repeat", type=int, default=32, help="Without --prompts, run the example 00 prompt N times.")
+    parser.add_argument("--processes", default="4", help="Number of processes, or a list (1,2,4,8) to report scaling.")
+    parser.add_argument("--rate", type=float, default=0, help="Runs started per second, across all processes (0: no limit).")
+    parser.add_argument("--output", help="Write the merged results to this JSONL file instead of printing them.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    endpoint = os.environ["AZURE_AI_AGENT_ENDPOINT"]
+    model_deployment_name = os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
+    prompts = _read_prompts(args.prompts, args.repeat)
+    process_counts = [int(value) for value in args.processes.split(",")]
+
+    agent_client = AgentsClient(endpoint=endpoint, credential=DefaultAzureCredential())
+    agent = agent_client.create_agent(
+        model=model_deployment_name,
+        name="Sharded Assistant",
+        instructions="Answer the user's questions.",
+    )
+    print(f"Agent created with ID: {agent.id}")
+
+    scaling: list[dict[str, Any]] = []
+    results: list[PromptResult] = []
+    try:
+        for processes in process_counts:
+            start = time.perf_counter()
+            results = run_sharded(endpoint, agent.id, prompts, processes, args.rate)
+            elapsed = time.perf_counter() - start
+            succeeded = sum(result.status == "completed" for result in results)
+            scaling.append({"processes": processes, "seconds": elapsed, "succeeded": succeeded,
+                            "throughput": succeeded / elapsed})
+            print(f"{processes} processes: {len(results)} prompts in {elapsed:.1f}s, {succeeded} completed "
+                  f"({succeeded / elapsed:.2f} completed prompts/s)")
+        _write_results(results, args.output)
+    finally:
+        agent_client.delete_agent(agent.id)
+        print(f"Deleted agent with ID: {agent.id}")
+
+    if len(scaling) > 1:
+        print("\n***** Throughput scaling *****")
+        base = scaling[0]["throughput"]
+        for step in scaling:
+            speedup = f"x{step['throughput'] / base:.2f}" if base else "n/a"
+            print(f"{step['processes']:>3} processes: {step['throughput']:6.2f} completed prompts/s  "
+                  f"speedup {speedup}  ({step['succeeded']} completed)")
+
+
+if __name__ == "__main__":
+    main()
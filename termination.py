@@ -0,0 +1,195 @@
+"""
+Pluggable termination strategies for group chat orchestrations.
+
+In example 06 every Student answer costs a full Teacher turn (an LLM round trip) just to say "approved".
+For verifiable tasks the answer can be checked locally: `ArithmeticAnswerStrategy` evaluates the arithmetic in the
+Teacher's question and compares it with the number in the Student's answer.
+When it can decide with confidence, the orchestration ends without asking the Teacher again.
+When it can't (no arithmetic in the question, no number or several numbers in the answer, an answer that is negated
+or hedged: "not 12", "is it 12?", "maybe 12"...), the decision falls back to the
+next strategy, usually `ApproverKeywordStrategy`: the LLM reviewer saying "approved".
+
+A strategy returns `True` (terminate), `False` (continue) or `None` (can't tell, ask the next strategy).
+`TerminationStrategyChain` asks the strategies in order and keeps counters of the decisions taken locally,
+so the orchestration can report the rounds (and seconds) saved.
+
+Strategies only read the `name` and `content` of the messages, so they work both on `ChatMessageContent` and on the
+`TranscriptRecord`s of a `BoundedChatHistory` (see chat_history_store.py).
+"""
+
+import ast
+import operator
+import re
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Protocol
+
+
+class ChatMessage(Protocol):
+    @property
+    def name(self) -> str | None: ...
+
+    @property
+    def content(self) -> str | None: ...
+
+
+class TerminationStrategy(Protocol):
+    def should_terminate(self, messages: Sequence[ChatMessage]) -> bool | None: ...
+
+
+class ApproverKeywordStrategy:
+    """The LLM reviewer decides: terminate when its last message contains the approval keyword."""
+
+    def __init__(self, approver_name: str, keyword: str = "approved"):
+        self.approver_name = approver_name
+        self.keyword = keyword
+
+    def should_terminate(self, messages: Sequence[ChatMessage]) -> bool | None:
+        last = messages[-1] if messages else None
+        if last is None or last.name != self.approver_name:
+            return None
+        return self.keyword in (last.content or "").lower()
+
+
+_OPERATORS: dict[type[ast.operator], Callable[[float, float], float]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_WORD_OPERATORS = [
+    (re.compile(r"\s+plus\s+", re.IGNORECASE), " + "),
+    (re.compile(r"\s+minus\s+", re.IGNORECASE), " - "),
+    (re.compile(r"\s+(?:times|multiplied by)\s+", re.IGNORECASE), " * "),
+    (re.compile(r"\s+divided by\s+", re.IGNORECASE), " / "),
+    (re.compile(r"(?<=\d)\s*[xX×·]\s*(?=\d)"), " * "),
+    (re.compile(r"÷"), " / "),
+    (re.compile(r"[−–]"), " - "),
+]
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_EXPRESSION_PATTERN = re.compile(rf"\(?\s*{_NUMBER}(?:\s*\)?\s*[-+*/]\s*\(?\s*{_NUMBER}\s*\)?)+")
+_NUMBER_PATTERN = re.compile(rf"-?{_NUMBER}")
+_NUMBER_WORDS = {
+    word: index for index, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen "
+        "seventeen eighteen nineteen twenty".split()
+    )
+}
+_NUMBER_WORD_PATTERN = re.compile(rf"\b({'|'.join(_NUMBER_WORDS)})\b", re.IGNORECASE)
+# Answers that deny, question or doubt their number are left to the reviewer.
+_UNSURE_PATTERN = re.compile(
+    r"\?|\b(?:not|never|maybe|perhaps|possibly|probably|might|guess|unsure|think|believe)\b|\w+n['’]t\b",
+    re.IGNORECASE,
+)
+
+
+def _normalize(text: str) -> str:
+    text = text.replace(",", "")
+    for pattern, replacement in _WORD_OPERATORS:
+        text = pattern.sub(replacement, text)
+    return _NUMBER_WORD_PATTERN.sub(lambda match: str(_NUMBER_WORDS[match.group(1).lower()]), text)
+
+
+def _evaluate(node: ast.AST) -> float:
+    """Evaluates a parsed expression made only of numbers and + - * /."""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_evaluate(node.operand)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def expected_answer(question: str) -> float | None:
+    """The value of the single arithmetic expression in the question, or None if there isn't exactly one."""
+    expressions = {match.group(0).strip() for match in _EXPRESSION_PATTERN.finditer(_normalize(question))}
+    if len(expressions) != 1:
+        return None
+    try:
+        return _evaluate(ast.parse(expressions.pop(), mode="eval"))
+    except (SyntaxError, ValueError, ZeroDivisionError):
+        return None
+
+
+def given_answer(answer: str) -> float | None:
+    """
+    The number the answer gives: the numbers after the last '=', else the numbers left once expressions are removed.
+    None unless they are all the same number, and the answer doesn't negate, question or hedge it:
+    "12, not 13", "It's not 12.", "Is it 12?" or "maybe 12" are not confident answers.
+    """
+    if _UNSURE_PATTERN.search(answer):
+        return None
+    text = _normalize(answer)
+    if "=" in text:
+        text = text.rsplit("=", 1)[1]
+    else:
+        text = _EXPRESSION_PATTERN.sub(" ", text)
+    numbers = {float(number) for number in _NUMBER_PATTERN.findall(text)}
+    return numbers.pop() if len(numbers) == 1 else None
+
+
+class ArithmeticAnswerStrategy:
+    """
+    Verifies the answer locally: when the last message comes from the answerer and the question (the last message of
+    the questioner) contains one arithmetic expression, the answer is right if the only number it gives is the
+    expected one.
+    A right answer terminates; a wrong one returns None so the reviewer can explain the mistake.
+    """
+
+    def __init__(self, questioner_name: str, answerer_name: str, tolerance: float = 1e-6):
+        self.questioner_name = questioner_name
+        self.answerer_name = answerer_name
+        self.tolerance = tolerance
+
+    def should_terminate(self, messages: Sequence[ChatMessage]) -> bool | None:
+        last = messages[-1] if messages else None
+        if last is None or last.name != self.answerer_name:
+            return None
+        question = next((message for message in reversed(messages) if message.name == self.questioner_name), None)
+        if question is None:
+            return None
+        expected = expected_answer(question.content or "")
+        given = given_answer(last.content or "")
+        if expected is None or given is None:
+            return None
+        return True if abs(expected - given) <= self.tolerance else None
+
+
+@dataclass
+class TerminationStats:
+    rounds: int = 0
+    local_decisions: int = 0
+    rounds_saved: int = 0
+
+
+class TerminationStrategyChain:
+    """
+    Asks the strategies in order, the first one that can decide wins. If none can, the chat continues.
+    Strategies listed before `fallback_index` are local: a termination decided by them saves a reviewer round.
+    """
+
+    def __init__(self, strategies: Sequence[TerminationStrategy], fallback_index: int | None = None):
+        self.strategies = list(strategies)
+        self.fallback_index = len(self.strategies) - 1 if fallback_index is None else fallback_index
+        self.stats = TerminationStats()
+        self.reason = ""
+
+    def should_terminate(self, messages: Sequence[ChatMessage]) -> bool:
+        self.stats.rounds += 1
+        for index, strategy in enumerate(self.strategies):
+            decision = strategy.should_terminate(messages)
+            if decision is None:
+                continue
+            self.reason = f"{type(strategy).__name__}: {'terminate' if decision else 'continue'}"
+            if index < self.fallback_index:
+                self.stats.local_decisions += 1
+                if decision:
+                    self.stats.rounds_saved += 1
+            return decision
+        self.reason = "No strategy could decide."
+        return False
@@ -0,0 +1,55 @@
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent
+
+from chat_history_store import BoundedChatHistory, TrimmedChatHistory
+
+
+def message(index: int) -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, name="Writer" if index % 2 else "Reviewer",
+                              content=f"message {index}")
+
+
+def test_trimmed_chat_history_keeps_the_last_messages_through_deep_copies():
+    chat_history = TrimmedChatHistory(max_messages=3)
+    for index in range(1, 11):
+        chat_history.add_message(message(index))
+
+    copy = chat_history.model_copy(deep=True)
+
+    assert [item.content for item in copy.messages] == ["message 8", "message 9", "message 10"]
+    assert isinstance(copy, TrimmedChatHistory)
+    assert copy.messages_added == 10
+
+
+def test_bounded_history_catches_up_with_a_trimmed_chat_history():
+    chat_history = TrimmedChatHistory(max_messages=4)
+    history = BoundedChatHistory(max_recent=3)
+    for index in range(1, 8):
+        chat_history.add_message(message(index))
+        if index % 3 == 0:
+            history.catch_up(chat_history.model_copy(deep=True))
+    history.catch_up(chat_history)
+
+    assert history.messages_seen == 7
+    assert [record.index for record in history.recent] == [5, 6, 7]
+    assert {summary.name: (summary.turns, summary.first_index, summary.last_index)
+            for summary in history.summaries} == {"Writer": (2, 1, 3), "Reviewer": (2, 2, 4)}
+
+
+def test_bounded_history_catches_up_with_a_plain_chat_history():
+    chat_history = ChatHistory()
+    history = BoundedChatHistory()
+    chat_history.add_message(message(1))
+    history.catch_up(chat_history)
+    chat_history.add_message(message(2))
+    history.catch_up(chat_history)
+    history.catch_up(chat_history)
+
+    assert [record.content for record in history.recent] == ["message 1", "message 2"]
+
+
+def test_records_keep_the_role_value():
+    history = BoundedChatHistory()
+    history.add(message(1))
+    history.add(ChatMessageContent(role=AuthorRole.USER, content="Transferred to Writer"))
+
+    assert [record.role for record in history.recent] == ["assistant", "user"]
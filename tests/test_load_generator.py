@@ -0,0 +1,174 @@
+import asyncio
+import random
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from load_generator import (LatencyHistogram, RunFailedError, Sample, StepResult, ThrottledError, is_throttle, run_step,
+                            saturation_throughput)
+
+
+class FakeFlow:
+    """A flow whose requests succeed, fail, get throttled or hang, in turn."""
+
+    name = "fake"
+
+    def __init__(self, *outcomes: str):
+        self.outcomes = outcomes
+        self.requests = 0
+        self.cleanups = 0
+
+    async def setup(self) -> None:
+        pass
+
+    async def request(self, sample: Sample) -> None:
+        outcome = self.outcomes[self.requests % len(self.outcomes)]
+        self.requests += 1
+        try:
+            with sample.phase("run"):
+                if outcome == "throttle":
+                    raise ThrottledError("rate_limit_exceeded")
+                if outcome == "error":
+                    raise RunFailedError("server_error")
+                if outcome == "hang":
+                    await asyncio.Event().wait()
+        finally:
+            self.cleanups += 1
+
+    async def teardown(self) -> None:
+        pass
+
+
+def make_step(succeeded: int = 0, errors: int = 0, throttled: int = 0, dropped: int = 0,
+              elapsed: float = 10.0) -> StepResult:
+    sent = succeeded + errors + throttled + dropped
+    return StepResult(rate=1.0, duration=elapsed, sent=sent, succeeded=succeeded, errors=errors, throttled=throttled,
+                      dropped=dropped, elapsed=elapsed)
+
+
+# Latency histogram
+
+def test_histogram_keeps_small_values_exact_and_big_ones_within_precision():
+    histogram = LatencyHistogram(significant_figures=3)
+    for milliseconds in range(1, 101):
+        histogram.record(milliseconds / 1000)
+    histogram.record(0.000_123)
+    histogram.record(123.456)
+
+    assert histogram.count == 102
+    assert histogram.percentile(0) == pytest.approx(0.000_123)
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=1e-3)
+    assert histogram.percentile(99) == pytest.approx(0.100, rel=1e-3)
+    assert histogram.percentile(100) == pytest.approx(123.456, rel=1e-3)
+    assert histogram.max_us == 123_456_000
+
+
+def test_histogram_memory_is_bounded_by_the_precision():
+    histogram = LatencyHistogram(significant_figures=2)
+    rng = random.Random(1)
+    for _ in range(20_000):
+        histogram.record(rng.uniform(0.5, 1.5))
+
+    assert len(histogram._counts) < 300  # pyright: ignore[reportPrivateUsage]
+
+
+def test_histogram_merge_matches_recording_everything_in_one():
+    first, second, together = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for index, seconds in enumerate(0.01 * value for value in range(1, 200)):
+        (first if index % 2 else second).record(seconds)
+        together.record(seconds)
+
+    first.merge(second)
+    first.merge(LatencyHistogram())
+
+    assert (first.count, first.min_us, first.max_us, first.total_us) == \
+        (together.count, together.min_us, together.max_us, together.total_us)
+    assert [first.percentile(p) for p in (50, 90, 99)] == [together.percentile(p) for p in (50, 90, 99)]
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert histogram.mean() == 0.0
+    assert histogram.summary() == "no samples"
+
+
+# Step results
+
+def test_step_rates():
+    step = make_step(succeeded=80, errors=5, throttled=10, dropped=5, elapsed=20.0)
+
+    assert step.throughput == 4.0
+    assert step.error_rate == pytest.approx(0.10)
+    assert step.throttle_rate == pytest.approx(0.10)
+    assert step.is_healthy(max_failure_rate=0.2)
+    assert not step.is_healthy(max_failure_rate=0.19)
+
+
+def test_a_step_without_successes_is_not_healthy():
+    assert not make_step().is_healthy(max_failure_rate=1.0)
+    assert make_step().throughput == 0.0
+
+
+def test_saturation_throughput_is_the_best_healthy_throughput():
+    results = [
+        make_step(succeeded=10),
+        make_step(succeeded=30),
+        make_step(succeeded=50, throttled=20),  # the best throughput, but throttled
+    ]
+
+    assert saturation_throughput(results, max_failure_rate=0.01) == 3.0
+    assert saturation_throughput([make_step(errors=3)], max_failure_rate=0.01) == 0.0
+
+
+# Throttles
+
+def test_is_throttle():
+    throttled_response = HttpResponseError(message="Too many requests")
+    throttled_response.status_code = 429
+    bad_request = HttpResponseError(message="Bad request")
+    bad_request.status_code = 400
+
+    try:
+        raise RuntimeError("Run failed") from throttled_response
+    except RuntimeError as error:
+        chained = error
+
+    assert is_throttle(ThrottledError())
+    assert is_throttle(throttled_response)
+    assert is_throttle(chained)
+    # Semantic Kernel only keeps the run error in the message.
+    assert is_throttle(Exception("Run failed with error: Rate limit is exceeded. Try again in 20 seconds."))
+    assert not is_throttle(bad_request)
+    assert not is_throttle(RunFailedError("server_error"))
+
+
+# Open loop steps
+
+def test_run_step_counts_every_request_sent():
+    flow = FakeFlow("ok", "ok", "error", "throttle")
+
+    result = asyncio.run(run_step(flow, rate=200, duration=0.2, max_in_flight=100, drain_timeout=1,
+                                  rng=random.Random(1)))
+
+    assert result.sent == flow.requests > 0
+    assert result.sent == result.succeeded + result.errors + result.throttled + result.dropped
+    assert result.dropped == 0
+    assert result.errors > 0 and result.throttled > 0
+    assert result.end_to_end.count == result.succeeded
+    assert result.phases["run"].count == result.succeeded
+    assert result.elapsed >= 0.2 * 0.5
+
+
+def test_run_step_drops_requests_over_the_limit_and_cancels_the_stragglers():
+    flow = FakeFlow("hang")
+
+    result = asyncio.run(run_step(flow, rate=200, duration=0.2, max_in_flight=2, drain_timeout=0.05,
+                                  rng=random.Random(1)))
+
+    assert flow.requests == 2
+    assert result.dropped == result.sent - 2
+    # The cancelled requests are errors, and they ran their cleanup before run_step returned.
+    assert result.errors == 2
+    assert flow.cleanups == 2
+    assert result.succeeded == 0
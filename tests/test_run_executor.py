@@ -0,0 +1,327 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from azure.core.exceptions import HttpResponseError, ServiceResponseError
+
+import run_executor
+from run_executor import CircuitBreaker, CircuitOpenError, CircuitState, FailureKind, RunExecutor, classify_run
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(run_executor.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    recorded: list[float] = []
+    monkeypatch.setattr(run_executor.time, "sleep", recorded.append)
+    return recorded
+
+
+def make_run(status: str, code: str | None = None, message: str = "") -> SimpleNamespace:
+    last_error = {"code": code, "message": message} if code else None
+    return SimpleNamespace(id=f"run_{status}", status=status, last_error=last_error)
+
+
+def make_client(mocker: Any, *outcomes: Any, runs_on_thread: list[Any] | None = None) -> SimpleNamespace:
+    return SimpleNamespace(runs=SimpleNamespace(create_and_process=mocker.Mock(side_effect=list(outcomes)),
+                                                list=mocker.Mock(return_value=runs_on_thread or []),
+                                                cancel=mocker.Mock(), get=mocker.Mock()))
+
+
+def throttled_error(headers: dict[str, str]) -> HttpResponseError:
+    error = HttpResponseError(message="Too many requests")
+    error.status_code = 429
+    error.response = SimpleNamespace(headers=headers)  # type: ignore[assignment]
+    return error
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_runs):
+        token = breaker.allow()
+        assert token is not None
+        breaker.record(token, success=False)
+
+
+# Circuit breaker
+
+def test_breaker_opens_when_failure_rate_reaches_threshold(clock: FakeClock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_runs=4)
+    for success in (True, True, False):
+        breaker.record(breaker.allow() or 0, success)
+    assert breaker.state is CircuitState.CLOSED
+
+    breaker.record(breaker.allow() or 0, success=False)
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.allow() is None
+    assert breaker.times_opened == 1
+
+
+def test_breaker_half_opens_after_cooldown_with_a_single_probe(clock: FakeClock):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+
+    clock.now += 30
+
+    assert breaker.state is CircuitState.HALF_OPEN
+    probe = breaker.allow()
+    assert probe is not None
+    assert breaker.allow() is None
+
+    breaker.record(probe, success=True)
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_breaker_reopens_when_probe_fails(clock: FakeClock):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+    clock.now += 30
+
+    breaker.record(breaker.allow() or 0, success=False)
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_breaker_ignores_outcomes_of_runs_started_before_it_opened(clock: FakeClock):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    stale = breaker.allow()
+    assert stale is not None
+    open_breaker(breaker)
+
+    # Landing while open: no reopen, no new cooldown.
+    breaker.record(stale, success=False)
+    assert breaker.times_opened == 1
+
+    clock.now += 30
+    probe = breaker.allow()
+    # Landing while half open: not the probe, so it neither closes nor reopens the breaker.
+    breaker.record(stale, success=True)
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.record(stale, success=False)
+    assert breaker.state is CircuitState.HALF_OPEN
+
+    breaker.record(probe or 0, success=True)
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_breaker_ignores_failures_while_open(clock: FakeClock):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+    clock.now += 10
+    late = [breaker.allow() for _ in range(3)]
+    assert late == [None, None, None]
+
+    clock.now += 20
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.times_opened == 1
+
+
+def test_breaker_release_frees_probe_that_ended_without_outcome(clock: FakeClock):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+    clock.now += 30
+    probe = breaker.allow()
+    assert probe is not None
+
+    breaker.release(probe)
+
+    assert breaker.allow() is not None
+
+
+# Run classification
+
+@pytest.mark.parametrize(("status", "code", "expected"), [
+    ("completed", None, None),
+    ("requires_action", None, None),
+    ("failed", "rate_limit_exceeded", FailureKind.THROTTLE),
+    ("failed", "server_error", FailureKind.TRANSIENT),
+    ("failed", "invalid_prompt", FailureKind.PERMANENT),
+    ("expired", None, FailureKind.TRANSIENT),
+    ("cancelled", None, FailureKind.PERMANENT),
+    ("incomplete", None, FailureKind.PERMANENT),
+])
+def test_classify_run(status: str, code: str | None, expected: FailureKind | None):
+    assert classify_run(make_run(status, code)) is expected
+
+
+# Backoff
+
+def test_backoff_is_jittered_below_the_cap():
+    executor = RunExecutor(base_backoff=1.0, max_backoff=8.0)
+    for retry in range(6):
+        for _ in range(50):
+            assert 0 <= executor.backoff(retry) <= min(8.0, 2.0**retry)
+
+
+def test_backoff_waits_at_least_retry_after_but_not_past_the_cap():
+    executor = RunExecutor(base_backoff=0.001, max_backoff=10.0)
+    assert executor.backoff(0, retry_after=5.0) >= 5.0
+    assert executor.backoff(0, retry_after=60.0) == 10.0
+
+
+# Run executor
+
+def test_retries_transient_failures_in_a_new_run(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, make_run("failed", "server_error"), make_run("expired"), make_run("completed"))
+    executor = RunExecutor(base_backoff=0.01)
+
+    run = executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert run.status == "completed"
+    assert client.runs.create_and_process.call_count == 3
+    assert len(sleeps) == 2
+    metrics = executor.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["succeeded"] == 1
+    assert metrics["failures_by_code"] == {"server_error": 1, "expired": 1}
+
+
+def test_does_not_retry_or_count_as_success_a_cancelled_run(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, make_run("cancelled"))
+    executor = RunExecutor()
+
+    run = executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert run.status == "cancelled"
+    assert sleeps == []
+    assert executor.metrics()["succeeded"] == 0
+    assert executor.metrics()["failed"] == 1
+
+
+def test_uses_retry_after_from_throttled_run_message(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, make_run("failed", "rate_limit_exceeded", "Try again in 7 seconds."),
+                         make_run("completed"))
+    executor = RunExecutor(base_backoff=0.01)
+
+    executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert sleeps[0] >= 7
+
+
+@pytest.mark.parametrize(("headers", "minimum"), [
+    ({"Retry-After": "4"}, 4.0),
+    ({"retry-after-ms": "2500"}, 2.5),
+])
+def test_uses_retry_after_header_of_throttled_response(mocker: Any, sleeps: list[float], headers: dict[str, str],
+                                                       minimum: float):
+    client = make_client(mocker, throttled_error(headers), make_run("completed"))
+    executor = RunExecutor(base_backoff=0.01)
+
+    executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert sleeps[0] >= minimum
+    assert executor.metrics()["failures_by_code"] == {"http_429": 1}
+
+
+def test_reraises_when_retries_run_out(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, *[throttled_error({}) for _ in range(3)])
+    executor = RunExecutor(max_retries=2, base_backoff=0.01)
+
+    with pytest.raises(HttpResponseError):
+        executor.run(client, thread_id="thread", agent_id="agent")
+    assert len(sleeps) == 2
+
+
+def test_sheds_runs_while_the_breaker_is_open(mocker: Any, clock: FakeClock, sleeps: list[float]):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+    client = make_client(mocker, make_run("completed"))
+    executor = RunExecutor(circuit_breaker=breaker)
+
+    with pytest.raises(CircuitOpenError):
+        executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert client.runs.create_and_process.call_count == 0
+    assert executor.metrics()["shed"] == 1
+    assert executor.metrics()["circuit_state"] == "open"
+
+
+def test_interrupted_probe_does_not_block_the_breaker(mocker: Any, clock: FakeClock, sleeps: list[float]):
+    breaker = CircuitBreaker(min_runs=2, cooldown=30)
+    open_breaker(breaker)
+    clock.now += 30
+    client = make_client(mocker, KeyboardInterrupt(), make_run("completed"))
+    executor = RunExecutor(circuit_breaker=breaker)
+
+    with pytest.raises(KeyboardInterrupt):
+        executor.run(client, thread_id="thread", agent_id="agent")
+    run = executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert run.status == "completed"
+    assert breaker.state is CircuitState.CLOSED
+
+
+# Runs left active on the thread by a failed attempt
+
+def test_cancels_the_run_left_active_and_waits_for_it_before_retrying(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, ServiceResponseError("connection reset while polling"), make_run("completed"),
+                         runs_on_thread=[make_run("in_progress")])
+    client.runs.get.side_effect = [make_run("cancelling"), make_run("cancelled")]
+    executor = RunExecutor(base_backoff=0.01)
+
+    run = executor.run(client, thread_id="thread", agent_id="agent")
+
+    assert run.status == "completed"
+    client.runs.list.assert_called_once_with(thread_id="thread", limit=1, order="desc")
+    client.runs.cancel.assert_called_once_with(thread_id="thread", run_id="run_in_progress")
+    assert client.runs.get.call_count == 2
+    assert client.runs.create_and_process.call_count == 2
+
+
+def test_does_not_cancel_a_run_that_already_finished(mocker: Any, sleeps: list[float]):
+    client = make_client(mocker, ServiceResponseError("reset"), make_run("completed"),
+                         runs_on_thread=[make_run("failed", "server_error")])
+    executor = RunExecutor(base_backoff=0.01)
+
+    executor.run(client, thread_id="thread", agent_id="agent")
+
+    client.runs.cancel.assert_not_called()
+    assert client.runs.create_and_process.call_count == 2
+
+
+@pytest.mark.parametrize("broken", ["still_active", "list_fails"])
+def test_reraises_when_the_thread_cannot_be_freed(mocker: Any, sleeps: list[float], broken: str):
+    client = make_client(mocker, ServiceResponseError("reset"), make_run("completed"),
+                         runs_on_thread=[make_run("in_progress")])
+    client.runs.get.return_value = make_run("cancelling")
+    if broken == "list_fails":
+        client.runs.list.side_effect = ServiceResponseError("reset")
+    executor = RunExecutor(base_backoff=0.01, settle_timeout=0)
+
+    with pytest.raises(ServiceResponseError):
+        executor.run(client, thread_id="thread", agent_id="agent")
+    assert client.runs.create_and_process.call_count == 1
+
+
+def test_async_cancels_the_run_left_active_before_retrying(mocker: Any, monkeypatch: pytest.MonkeyPatch):
+    async def no_sleep(_: float) -> None:
+        pass
+
+    async def list_runs(**_: Any):
+        yield make_run("in_progress")
+
+    monkeypatch.setattr(run_executor.asyncio, "sleep", no_sleep)
+    client = SimpleNamespace(runs=SimpleNamespace(
+        create_and_process=mocker.AsyncMock(side_effect=[ServiceResponseError("reset"), make_run("completed")]),
+        list=list_runs, cancel=mocker.AsyncMock(), get=mocker.AsyncMock(return_value=make_run("cancelled"))))
+    executor = RunExecutor(base_backoff=0.01)
+
+    run = asyncio.run(executor.arun(client, thread_id="thread", agent_id="agent"))
+
+    assert run.status == "completed"
+    client.runs.cancel.assert_awaited_once_with(thread_id="thread", run_id="run_in_progress")
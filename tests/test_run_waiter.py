@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+
+import run_waiter
+from run_waiter import RunWaiter
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def asleep(_: float) -> None:
+        pass
+
+    monkeypatch.setattr(run_waiter.time, "sleep", lambda _: None)
+    monkeypatch.setattr(run_waiter.asyncio, "sleep", asleep)
+
+
+def make_run(status: str) -> SimpleNamespace:
+    return SimpleNamespace(id="run", status=status, completed_at=None, failed_at=None, cancelled_at=None)
+
+
+def http_error(status_code: int) -> HttpResponseError:
+    error = HttpResponseError(message=f"HTTP {status_code}")
+    error.status_code = status_code
+    return error
+
+
+def make_client(mocker: Any, *polls: Any, is_async: bool = False) -> SimpleNamespace:
+    mock = mocker.AsyncMock if is_async else mocker.Mock
+    return SimpleNamespace(runs=SimpleNamespace(create=mock(return_value=make_run("queued")),
+                                                get=mock(side_effect=list(polls)), cancel=mock()))
+
+
+def test_keeps_polling_through_transient_errors(mocker: Any):
+    client = make_client(mocker, ServiceRequestError("reset"), http_error(503), make_run("in_progress"),
+                         http_error(429), make_run("completed"))
+    waiter = RunWaiter()
+
+    run = waiter.create_and_wait(client, thread_id="thread", agent_id="agent")
+
+    assert run.status == "completed"
+    assert waiter.last_stats is not None and waiter.last_stats.polls == 5
+    client.runs.cancel.assert_not_called()
+
+
+def test_cancels_the_run_on_a_permanent_poll_error(mocker: Any):
+    client = make_client(mocker, http_error(404))
+
+    with pytest.raises(HttpResponseError):
+        RunWaiter().create_and_wait(client, thread_id="thread", agent_id="agent")
+
+    client.runs.cancel.assert_called_once_with(thread_id="thread", run_id="run")
+
+
+def test_cancels_the_run_when_poll_errors_persist(mocker: Any):
+    client = make_client(mocker, *[http_error(503) for _ in range(3)])
+    client.runs.cancel.side_effect = http_error(503)
+
+    with pytest.raises(HttpResponseError):
+        RunWaiter(max_poll_errors=2).create_and_wait(client, thread_id="thread", agent_id="agent")
+
+    assert client.runs.get.call_count == 3
+    client.runs.cancel.assert_called_once()
+
+
+def test_async_cancels_the_run_on_a_permanent_poll_error(mocker: Any):
+    client = make_client(mocker, make_run("in_progress"), http_error(401), is_async=True)
+
+    with pytest.raises(HttpResponseError):
+        asyncio.run(RunWaiter().acreate_and_wait(client, thread_id="thread", agent_id="agent"))
+
+    client.runs.cancel.assert_awaited_once_with(thread_id="thread", run_id="run")
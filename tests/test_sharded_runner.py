@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+import sharded_runner
+from run_executor import CircuitOpenError, RunExecutor
+from sharded_runner import SharedRateLimiter, _Worker
+
+
+def make_worker(mocker: Any, run_executor: Any) -> _Worker:
+    worker = _Worker.__new__(_Worker)
+    worker.client = SimpleNamespace(
+        threads=SimpleNamespace(create=mocker.Mock(return_value=SimpleNamespace(id="thread")), delete=mocker.Mock()),
+        messages=SimpleNamespace(create=mocker.Mock(), list=mocker.Mock(return_value=[])),
+    )
+    worker.agent_id = "agent"
+    worker.run_executor = run_executor
+    return worker
+
+
+def test_a_failing_prompt_gets_an_error_result(mocker: Any):
+    run_executor = mocker.Mock(spec=RunExecutor)
+    run_executor.run.side_effect = HttpResponseError(message="Bad request")
+    worker = make_worker(mocker, run_executor)
+    worker.client.threads.delete.side_effect = HttpResponseError(message="Not found")
+
+    result = worker.run_prompt(3, "prompt")
+
+    assert (result.index, result.status) == (3, "error")
+    assert "Bad request" in result.answer
+    worker.client.threads.delete.assert_called_once_with("thread")
+
+
+def test_a_shed_prompt_deletes_its_thread(mocker: Any):
+    run_executor = mocker.Mock(spec=RunExecutor)
+    run_executor.run.side_effect = CircuitOpenError("open")
+    worker = make_worker(mocker, run_executor)
+
+    result = worker.run_prompt(0, "prompt")
+
+    assert result.status == "shed"
+    worker.client.threads.delete.assert_called_once_with("thread")
+
+
+def test_status_is_the_status_value(mocker: Any):
+    from azure.ai.agents.models import RunStatus
+
+    run_executor = mocker.Mock(spec=RunExecutor)
+    run_executor.run.return_value = SimpleNamespace(id="run", status=RunStatus.COMPLETED)
+    worker = make_worker(mocker, run_executor)
+
+    assert worker.run_prompt(0, "prompt").status == "completed"
+
+
+def test_rate_limiter_without_rate_still_waits_for_a_penalty(monkeypatch: pytest.MonkeyPatch):
+    sleeps: list[float] = []
+    monkeypatch.setattr(sharded_runner.time, "sleep", sleeps.append)
+    rate_limiter = SharedRateLimiter(rate=0)
+
+    rate_limiter.acquire()
+    rate_limiter.penalize(5)
+    rate_limiter.acquire()
+    rate_limiter.acquire()
+
+    assert sleeps[0] == 0
+    assert all(4 < seconds <= 5 for seconds in sleeps[1:])
+
+
+def test_rate_limiter_spaces_slots(monkeypatch: pytest.MonkeyPatch):
+    sleeps: list[float] = []
+    monkeypatch.setattr(sharded_runner.time, "sleep", sleeps.append)
+    monkeypatch.setattr(sharded_runner.time, "monotonic", lambda: 100.0)
+    rate_limiter = SharedRateLimiter(rate=4)
+
+    for _ in range(3):
+        rate_limiter.acquire()
+
+    assert sleeps == [0.0, 0.25, 0.5]
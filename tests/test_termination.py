@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+
+from termination import ArithmeticAnswerStrategy, given_answer
+
+
+@pytest.mark.parametrize(("answer", "expected"), [
+    ("7 + 5 = 12", 12.0),
+    ("12", 12.0),
+    ("7 + 5 is 12. So the answer is 12!", 12.0),
+    ("seven plus five equals twelve", 12.0),
+    ("The answer is 12, not 13.", None),
+    ("I think it is 12 or 13", None),
+    ("I don't know", None),
+    ("It's not 12.", None),
+    ("It isn't 12.", None),
+    ("Is it 12? I'm not sure.", None),
+    ("I'd guess 12 but maybe it's wrong", None),
+    ("I think it's 12", None),
+    ("Probably 12.", None),
+])
+def test_given_answer(answer: str, expected: float | None):
+    assert given_answer(answer) == expected
+
+
+def test_arithmetic_strategy_defers_an_ambiguous_answer():
+    strategy = ArithmeticAnswerStrategy("Teacher", "Student")
+    question = SimpleNamespace(name="Teacher", content="What is 7 + 5?")
+
+    def answer(content: str) -> list[SimpleNamespace]:
+        return [question, SimpleNamespace(name="Student", content=content)]
+
+    assert strategy.should_terminate(answer("7 + 5 = 12")) is True
+    assert strategy.should_terminate(answer("It's 12, not 13")) is None
+    assert strategy.should_terminate(answer("7 + 5 = 13")) is None
+
+
+@pytest.mark.parametrize("content", ["It's not 12.", "Is it 12? I'm not sure.", "I'd guess 12 but maybe it's wrong"])
+def test_arithmetic_strategy_leaves_negated_and_hedged_answers_to_the_reviewer(content: str):
+    strategy = ArithmeticAnswerStrategy("Teacher", "Student")
+    messages = [SimpleNamespace(name="Teacher", content="What is 7 + 5?"), SimpleNamespace(name="Student", content=content)]
+
+    assert strategy.should_terminate(messages) is None
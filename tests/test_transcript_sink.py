@@ -0,0 +1,44 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from transcript_sink import TranscriptSink
+
+
+def test_writes_and_rotates_compressed_files(tmp_path: Path):
+    with TranscriptSink(tmp_path / "chat", compression="gzip", max_bytes=1) as transcript:
+        for index in range(3):
+            transcript.write("message", {"index": index})
+
+    assert [path.name for path in transcript.files] == [f"chat.0000{index}.jsonl.gz" for index in range(3)]
+    records = [json.loads(line) for path in transcript.files for line in gzip.open(path)]
+    assert [record["data"]["index"] for record in records] == [0, 1, 2]
+
+
+def test_messages_keep_the_role_value(tmp_path: Path):
+    with TranscriptSink(tmp_path / "chat") as transcript:
+        transcript.message(ChatMessageContent(role=AuthorRole.ASSISTANT, name="Teacher", content="approved"))
+
+    record = json.loads(transcript.files[0].read_text())
+    assert record["data"] == {"name": "Teacher", "role": "assistant", "content": "approved"}
+
+
+def test_writer_errors_drop_records_and_are_raised_by_close(tmp_path: Path):
+    # A file where the transcript directory should be: the writer can't create the first file.
+    (tmp_path / "blocked").write_text("")
+    transcript = TranscriptSink(tmp_path / "blocked" / "chat")
+    transcript.write("message", {"index": 0})
+    transcript._thread.join(timeout=5)  # pyright: ignore[reportPrivateUsage]
+
+    # Logging never fails the caller: the records are dropped, and the sink reports it is disabled.
+    transcript.write("message", {"index": 1})
+    transcript.write("message", {"index": 2})
+    assert not transcript.enabled
+    assert transcript.records_dropped == 2
+
+    with pytest.raises(OSError):
+        transcript.close()
+    assert transcript.records_written == 0
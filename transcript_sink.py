@@ -0,0 +1,235 @@
+"""
+Streaming transcript export for agent and orchestration outputs.
+
+The examples only `print` the answers, so capturing them for analysis means scraping stdout.
+`TranscriptSink` streams every message, tool call and run as a line of JSON (JSONL):
+
+    {"ts": 1760000000.0, "kind": "message", "data": {"name": "Teacher", "role": "assistant", "content": "..."}}
+
+* The files can be compressed with gzip or zstd (zstd needs the `zstandard` package: `uv add zstandard`).
+* When a file reaches `max_bytes` on disk, it is closed and the next one is started:
+  `transcript.00000.jsonl.gz`, `transcript.00001.jsonl.gz`...
+* `message`, `tool_call` and `run` turn the SDK objects into plain data (`as_dict`, `model_dump`) and queue them:
+  the JSON encoding, compression and writing happen in a background thread, so logging doesn't block the event loop
+  on the disk or add latency to an agent turn.
+* If the writer thread fails (a full disk, a file that can't be opened), the records are dropped from then on
+  (`records_dropped`) and `enabled` turns False: logging never makes an agent turn fail. `close` raises the error.
+
+In the examples the sink is enabled by setting `AGENT_TRANSCRIPT_DIR` (and optionally `AGENT_TRANSCRIPT_COMPRESSION`,
+`gzip` or `zstd`) in the .env file. Without it `open_transcript_sink` returns a sink that does nothing.
+
+Usage:
+    with TranscriptSink("transcripts/example_00", compression="gzip") as transcript:
+        transcript.message(msg)
+        transcript.run(run)
+"""
+
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Literal, cast
+
+from dotenv import load_dotenv
+
+Compression = Literal["none", "gzip", "zstd"]
+
+_SUFFIXES: dict[str, str] = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Put in the queue to ask the writer thread to finish.
+_CLOSE = object()
+
+
+def _as_dict(value: Any) -> Any:
+    """Azure SDK models have `as_dict`, Semantic Kernel ones (pydantic) `model_dump`; anything else is kept as is."""
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+class TranscriptSink:
+    """Writes JSONL records from a background thread, with optional compression and size based rotation."""
+
+    def __init__(self, path: str | Path, compression: Compression = "none", max_bytes: int = 64 * 1024 * 1024,
+                 flush_interval: float = 1.0):
+        if compression not in _SUFFIXES:
+            raise ValueError(f"Unknown compression {compression!r}, use one of: {', '.join(_SUFFIXES)}")
+        if compression == "zstd":
+            # Fail now, in the caller, rather than later in the writer thread.
+            try:
+                import zstandard  # noqa: F401 # pyright: ignore[reportUnusedImport, reportMissingImports]
+            except ImportError as error:
+                raise ImportError("zstd compression needs the `zstandard` package: uv add zstandard") from error
+        self.path = Path(path)
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.records_dropped = 0
+        self.files: list[Path] = []
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._raw: BinaryIO | None = None
+        self._stream: Any = None
+        self._closed = False
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._writer, name="transcript-sink", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "TranscriptSink":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def enabled(self) -> bool:
+        """False once the sink is closed, or the writer thread failed."""
+        return not self._closed and self._error is None
+
+    def write(self, kind: str, data: Any) -> None:
+        """Queues a record. Never blocks: the record is encoded and written by the writer thread."""
+        if self._closed:
+            raise ValueError("The transcript sink is closed.")
+        if self._error is not None:
+            self.records_dropped += 1
+            return
+        self._queue.put({"ts": time.time(), "kind": kind, "data": data})
+
+    def message(self, message: Any) -> None:
+        """A chat message: a Semantic Kernel `ChatMessageContent` or a `ThreadMessage` of the agents SDK."""
+        if hasattr(message, "as_dict"):
+            self.write("message", message.as_dict())
+        else:
+            role = getattr(message.role, "value", message.role)
+            self.write("message", {"name": message.name, "role": role, "content": message.content})
+
+    def tool_call(self, tool_call: Any) -> None:
+        self.write("tool_call", _as_dict(tool_call))
+
+    def run(self, run: Any) -> None:
+        self.write("run", _as_dict(run))
+
+    def close(self) -> None:
+        """Writes everything still queued, and closes the current file. Raises the error of the writer thread, if any."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        if self._error is not None:
+            # The records still queued when the writer failed were never written either.
+            while not self._queue.empty():
+                if self._queue.get_nowait() is not _CLOSE:
+                    self.records_dropped += 1
+            raise self._error
+
+    def _open_next(self) -> Any:
+        """Closes the current file and opens the next one. Returns the stream to write to."""
+        self._close_file()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        path = self.path.with_name(f"{self.path.name}.{len(self.files):05d}.jsonl{_SUFFIXES[self.compression]}")
+        self._raw = open(path, "wb")
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            import zstandard  # pyright: ignore[reportMissingImports]
+
+            self._stream = cast(Any, zstandard).ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+        self.files.append(path)
+        return self._stream
+
+    def _close_file(self) -> None:
+        if self._raw is None:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+        self._raw = self._stream = None
+
+    def _writer(self) -> None:
+        try:
+            self._write_records()
+        except Exception as error:
+            print(f"The transcript writer failed, records are dropped from now on: {error!r}")
+            self._error = error
+            try:
+                self._close_file()
+            except Exception:
+                pass
+
+    def _write_records(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stream is not None:
+                    self._stream.flush()
+                continue
+            # Write everything queued meanwhile in one go.
+            batch = [record]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = any(item is _CLOSE for item in batch)
+            for item in batch:
+                if item is _CLOSE:
+                    continue
+                stream = self._stream
+                if stream is None or self._raw is None or self._raw.tell() >= self.max_bytes:
+                    stream = self._open_next()
+                stream.write((json.dumps(item, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                self.records_written += 1
+            if closing:
+                self._close_file()
+                return
+
+
+class NullTranscriptSink:
+    """A sink that drops everything, used when no transcript directory is configured."""
+
+    enabled = False
+
+    def __enter__(self) -> "NullTranscriptSink":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def write(self, kind: str, data: Any) -> None:
+        pass
+
+    def message(self, message: Any) -> None:
+        pass
+
+    def tool_call(self, tool_call: Any) -> None:
+        pass
+
+    def run(self, run: Any) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def open_transcript_sink(name: str) -> TranscriptSink | NullTranscriptSink:
+    """The sink configured with `AGENT_TRANSCRIPT_DIR` / `AGENT_TRANSCRIPT_COMPRESSION`, or one that does nothing."""
+    # Examples 05 and 06 don't load the .env file themselves.
+    load_dotenv()
+    directory = os.environ.get("AGENT_TRANSCRIPT_DIR")
+    if not directory:
+        return NullTranscriptSink()
+    compression = os.environ.get("AGENT_TRANSCRIPT_COMPRESSION", "none")
+    if compression not in _SUFFIXES:
+        raise ValueError(f"Unknown AGENT_TRANSCRIPT_COMPRESSION {compression!r}, use one of: {', '.join(_SUFFIXES)}")
+    sink = TranscriptSink(Path(directory) / name, compression=cast(Compression, compression))
+    print(f"Writing the transcript to {directory}")
+    return sink